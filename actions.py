@@ -6,13 +6,22 @@ Actions are used by the input event handler for returning an outcome (action) ba
 - BumpAction: Determines if the successive Action will be a 'MeleeAction' or a 'MovementAction'
 - MeleeAction: Attack an entity on an adjacent tile and handle damage/effects.
 - EscapeAction: Terminates the game.
+
+Actions use '__slots__' and can be re-aimed ('ActionWithDirection.aim()'), so hot paths (AI turns, key presses) reuse one
+instance per actor instead of allocating a new action every turn. That's safe because an action is always performed
+right after it's built/aimed, and never stored.
+
+Every action has a 'cost': the time units it takes at normal speed. The turn scheduler ('scheduler.py') uses it, scaled by
+the actor's 'speed', to work out when that actor's next turn comes up.
 '''
 
 
 #_______________________________________________________________________// MODULES
 
 from __future__ import annotations
-from typing import (Optional, Tuple, TYPE_CHECKING)
+from typing import (Optional, Tuple, TypeVar, TYPE_CHECKING)
+
+from scheduler import TURN_COST
 
 # Conditional modules
 if TYPE_CHECKING:
@@ -21,11 +30,22 @@ if TYPE_CHECKING:
 
 
 
+#_______________________________________________________________________// DECLARATION
+
+# Any directional action (so 'aim()' returns the subclass it was called on)
+D = TypeVar("D", bound="ActionWithDirection")
+
+
 #_______________________________________________________________________// CLASSES
 
 # Base class 
 class Action:
 
+    # Time units this action takes at 'NORMAL_SPEED' (subclasses that are quicker or slower override it)
+    cost = TURN_COST
+
+    __slots__ = ("entity",)
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
@@ -55,12 +75,17 @@ class Action:
 class EscapeAction(Action):
     ''' Close program / quit the game '''
 
+    __slots__ = ()
+
     def perform(self) -> None:
         raise SystemExit()
 
 
 
 class WaitAction(Action):
+
+    __slots__ = ()
+
     def perform(self) -> None:
         pass
 
@@ -73,6 +98,8 @@ class ActionWithDirection(Action):
     This yields sub-classes that determine WHAT the direciton/movement invokes.
     '''
 
+    __slots__ = ("dx", "dy")
+
     def __init__(self, entity: Actor, dx: int, dy: int):
         super().__init__(entity)
         # Direction of travel
@@ -80,6 +107,16 @@ class ActionWithDirection(Action):
         self.dy = dy
 
 
+    def aim(self: D, dx: int, dy: int) -> D:
+        '''
+        Points this action in a new direction and returns it, so one instance can be reused turn after turn.
+        '''
+        self.dx = dx
+        self.dy = dy
+
+        return self
+
+
     @property
     def dest_xy(self) -> Tuple[int, int]:
         ''' 
@@ -114,8 +151,13 @@ class MeleeAction(ActionWithDirection):
     Extends the 'ActionWithDirection' class to damage an entity in an adjacent tile (ie, 'melee attack').
 
     Takes the direction of travel (dx/dy) and attacks an entity in the way (if an entity occupies the destination tile).
+    Fighting is loud: every attack wakes/alerts the actors within 'noise_radius' tiles (see 'Engine.make_noise()').
     '''
 
+    noise_radius = 8
+
+    __slots__ = ()
+
     def perform(self) -> None:
         ''' 
         Uses the inherited 'target_actor' property (defined in 'ActionWithDirection' class) to receive the attack. 
@@ -125,6 +167,8 @@ class MeleeAction(ActionWithDirection):
         if not target:
             return
 
+        self.engine.make_noise(target.x, target.y, self.noise_radius)
+
         damage = self.entity.fighter.power - target.fighter.defense
 
         attack_desc = f"{self.entity.name.capitalize()} attacks {target.name}"
@@ -146,6 +190,8 @@ class MovementAction(ActionWithDirection):
     If so, call the entity's .move() method (which calculates the new tile to move to).
     '''
 
+    __slots__ = ()
+
     def perform(self) -> None:
         ''' 
         Commit this entity's movement to a destination by calling its own '.move()' method.
@@ -170,12 +216,25 @@ class BumpAction(ActionWithDirection):
     Extends 'ActionWithDirection' class to determine which action occurs next: 'MovementAction' or 'MeleeAction'
     '''
 
+    # The melee/movement actions this bump resolves to (created on first use, then re-aimed)
+    __slots__ = ("_melee", "_movement")
+
+    def __init__(self, entity: Actor, dx: int, dy: int):
+        super().__init__(entity, dx, dy)
+        self._melee: Optional[MeleeAction] = None
+        self._movement: Optional[MovementAction] = None
+
+
     def perform(self) -> None:
         '''
         Commit a 'MeleeAction' or a 'MovementAction' depending on whether a 'target_actor' is at this entity's destination.
         '''
         if self.target_actor:
-            return MeleeAction(self.entity, self.dx, self.dy).perform()
+            if self._melee is None:
+                self._melee = MeleeAction(self.entity, self.dx, self.dy)
+            return self._melee.aim(self.dx, self.dy).perform()
 
         else:
-            return MovementAction(self.entity, self.dx, self.dy).perform()
\ No newline at end of file
+            if self._movement is None:
+                self._movement = MovementAction(self.entity, self.dx, self.dy)
+            return self._movement.aim(self.dx, self.dy).perform()
\ No newline at end of file
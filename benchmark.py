@@ -0,0 +1,325 @@
+'''
+Benchmark suite for the engine's hot paths, run at parameterized map sizes and entity counts with fixed seeds.
+
+Cases:
+    procgen     - 'procgen.generate_random_dungeon()' (room count scales with map area)
+    cave        - 'procgen.generate_cave_layout()' (cellular automata plus largest-region labeling)
+    fov         - 'Engine.update_fov()' (FOV cache cleared before every call, so this times a real computation)
+    path        - 'BaseAI.get_path_to()' from a monster to the player
+    render      - 'GameMap.render()' into a console the size of the map
+    turns       - 'Engine.handle_enemy_turns()' with the whole map visible and every monster awake (every monster chases: worst case)
+    level_turns - 'Engine.handle_enemy_turns()' with the player's real FOV (monsters far from the player stay dormant)
+    memory      - bytes allocated per spawned actor (Actor + Fighter + AI + map/store bookkeeping), at each entity count
+
+Each case reports the best and median time over '--repeat' runs, plus peak memory (traced in a separate run with 'tracemalloc').
+Results can be saved as a baseline (JSON) and later runs compared against it to flag regressions.
+
+Usage:
+    >> python benchmark.py                                          (quick grid: 80x45 / 200x200, 10 / 1000 entities)
+    >> python benchmark.py --full                                   (80x45 up to 1000x1000, 10 up to 10k entities)
+    >> python benchmark.py --cases fov,turns --sizes 500x500 --entities 10000
+    >> python benchmark.py --save baseline.json
+    >> python benchmark.py --compare baseline.json --threshold 1.25 (exits with status 1 if any case got slower)
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import (Callable, Dict, List, Tuple)
+
+import numpy as np
+import tcod
+
+import entity_factories
+from headless import HeadlessGame
+from procgen import (generate_cave_layout, generate_random_dungeon)
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+SEED = 1234
+
+QUICK_SIZES     = [(80, 45), (200, 200)]
+QUICK_ENTITIES  = [10, 1_000]
+FULL_SIZES      = [(80, 45), (200, 200), (500, 500), (1000, 1000)]
+FULL_ENTITIES   = [10, 100, 1_000, 10_000]
+
+# A case takes (width, height, entity count) and returns a function that runs the measured code once
+CaseSetup = Callable[[int, int, int], Callable[[], None]]
+
+
+
+#_______________________________________________________________________// FUNCTIONS - SETUP
+
+def max_rooms_for(width: int, height: int) -> int:
+    '''
+    Scales the default 30 rooms on an 80x45 map to the given map area.
+    '''
+    return max(30, 30 * width * height // (80 * 45))
+
+
+
+def build_game(width: int, height: int, entity_count: int) -> HeadlessGame:
+    '''
+    Generates a seeded dungeon with no random enemies, then spawns 'entity_count' orcs/trolls on random free floor tiles.
+    '''
+    game = HeadlessGame(
+        map_width   = width,
+        map_height  = height,
+        max_rooms   = max_rooms_for(width, height),
+        max_enemies = 0,
+        seed        = SEED,
+    )
+    game_map = game.engine.game_map
+
+    floor_x, floor_y = np.nonzero(game_map.tiles["walkable"])
+    rng = np.random.default_rng(SEED)
+    for i in rng.permutation(len(floor_x))[: entity_count].tolist():
+        x, y = int(floor_x[i]), int(floor_y[i])
+        if game_map.get_entities_at_location(x, y):
+            continue
+        prototype = entity_factories.orc if random.random() < 0.8 else entity_factories.troll
+        prototype.spawn(game_map, x, y)
+
+    return game
+
+
+
+#_______________________________________________________________________// FUNCTIONS - CASES
+
+def case_procgen(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    game = build_game(80, 45, 0)
+
+    def run() -> None:
+        generate_random_dungeon(
+            max_rooms       = max_rooms_for(width, height),
+            room_min_size   = 6,
+            room_max_size   = 10,
+            map_width       = width,
+            map_height      = height,
+            max_enemies     = 2,
+            engine          = game.engine,
+            rng             = random.Random(SEED),
+        )
+    return run
+
+
+
+def case_cave(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    def run() -> None:
+        generate_cave_layout(width, height, random.Random(SEED))
+    return run
+
+
+
+def case_fov(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    engine = build_game(width, height, 0).engine
+
+    def run() -> None:
+        engine.game_map.fov_key = None
+        engine.game_map.fov_cache.clear()
+        engine.update_fov()
+    return run
+
+
+
+def case_path(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    game = build_game(width, height, max(1, entity_count))
+    engine = game.engine
+    # The monster furthest from the player gives the longest search
+    monsters = [actor for actor in engine.game_map.actors if actor is not engine.player]
+    monster = max(monsters, key=lambda actor: abs(actor.x - engine.player.x) + abs(actor.y - engine.player.y))
+
+    def run() -> None:
+        monster.ai.get_path_to(engine.player.x, engine.player.y)
+    return run
+
+
+
+def case_render(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    game_map = build_game(width, height, entity_count).engine.game_map
+    game_map.visible[:] = True
+    game_map.explored[:] = True
+    console = tcod.console.Console(width, height, order="F")
+
+    def run() -> None:
+        game_map.render(console)
+    return run
+
+
+
+def case_turns(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    engine = build_game(width, height, entity_count).engine
+    game_map = engine.game_map
+    game_map.visible[:] = True
+    # (Only actors near the player get woken by the engine: wake the whole level so everyone takes part)
+    game_map.dormant.wake(game_map.store.living_rows().tolist())
+
+    def run() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.handle_enemy_turns()
+    return run
+
+
+
+def case_level_turns(width: int, height: int, entity_count: int) -> Callable[[], None]:
+    engine = build_game(width, height, entity_count).engine
+
+    def run() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.handle_enemy_turns()
+    return run
+
+
+
+CASES: Dict[str, CaseSetup] = {
+    "procgen":  case_procgen,
+    "cave":     case_cave,
+    "fov":      case_fov,
+    "path":     case_path,
+    "render":   case_render,
+    "turns":    case_turns,
+    "level_turns":  case_level_turns,
+}
+
+# Cases whose cost doesn't depend on the entity count (only run once per map size)
+SIZE_ONLY_CASES = {"procgen", "cave", "fov"}
+
+# Cases that report memory per actor instead of timings
+MEMORY_CASES = {"memory"}
+
+
+
+def measure_actor_memory(width: int, height: int, entity_count: int) -> Dict[str, float]:
+    '''
+    Spawns 'entity_count' orcs on an empty map while tracing allocations, and reports the bytes still held per actor.
+    '''
+    game_map = build_game(width, height, 0).engine.game_map
+    floor_x, floor_y = np.nonzero(game_map.tiles["walkable"])
+    positions = list(zip(floor_x.tolist(), floor_y.tolist()))[: max(1, entity_count)]
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    actors = [entity_factories.orc.spawn(game_map, x, y) for x, y in positions]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"bytes_per_actor": (after - before) / len(actors)}
+
+
+
+#_______________________________________________________________________// FUNCTIONS - RUNNER
+
+def measure(setup: CaseSetup, width: int, height: int, entity_count: int, repeat: int) -> Dict[str, float]:
+    '''
+    Times 'repeat' runs of a case (after one warm-up run), then traces one more run for its peak memory.
+    '''
+    random.seed(SEED)
+    run = setup(width, height, entity_count)
+    run()
+
+    times: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"best_ms": min(times) * 1000, "median_ms": statistics.median(times) * 1000, "peak_kib": peak / 1024}
+
+
+
+def run_suite(cases: List[str], sizes: List[Tuple[int, int]], entity_counts: List[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    '''
+    Runs every case at every size/entity count and prints one line per result. Returns results keyed by "case WxH N".
+    '''
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':<28}{'best ms':>12}{'median ms':>12}{'peak KiB':>12}")
+
+    for name in cases:
+        for width, height in sizes:
+            counts = [0] if name in SIZE_ONLY_CASES else entity_counts
+            for entity_count in counts:
+                key = f"{name} {width}x{height} {entity_count}"
+                if name in MEMORY_CASES:
+                    results[key] = measure_actor_memory(width, height, entity_count)
+                    print(f"{key:<28}{results[key]['bytes_per_actor']:>12.1f} bytes/actor", flush=True)
+                    continue
+
+                result = measure(CASES[name], width, height, entity_count, repeat)
+                results[key] = result
+                print(f"{key:<28}{result['best_ms']:>12.3f}{result['median_ms']:>12.3f}{result['peak_kib']:>12.1f}", flush=True)
+
+    return results
+
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    '''
+    Returns a message for every timed case whose best time is more than 'threshold' times its baseline.
+    '''
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline or "best_ms" not in result:
+            continue
+        ratio = result["best_ms"] / max(baseline[key]["best_ms"], 1e-6)
+        if ratio > threshold:
+            regressions.append(f"{key}: {baseline[key]['best_ms']:.3f} ms -> {result['best_ms']:.3f} ms ({ratio:.2f}x)")
+
+    return regressions
+
+
+
+def parse_sizes(text: str) -> List[Tuple[int, int]]:
+    return [tuple(int(value) for value in size.split("x")) for size in text.split(",")]   # type: ignore
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark procgen, FOV, pathfinding, rendering and enemy turns.")
+    parser.add_argument("--cases", default=",".join([*CASES, *MEMORY_CASES]), help="comma separated: " + ",".join([*CASES, *MEMORY_CASES]))
+    parser.add_argument("--sizes", type=parse_sizes, default=None, help="comma separated WxH map sizes")
+    parser.add_argument("--entities", default=None, help="comma separated entity counts")
+    parser.add_argument("--full", action="store_true", help="run the full grid (up to 1000x1000 and 10k entities)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="PATH", help="save the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved JSON baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio flagged as a regression")
+    args = parser.parse_args()
+
+    sizes = args.sizes or (FULL_SIZES if args.full else QUICK_SIZES)
+    entity_counts = [int(count) for count in args.entities.split(",")] if args.entities else (FULL_ENTITIES if args.full else QUICK_ENTITIES)
+
+    results = run_suite(args.cases.split(","), sizes, entity_counts, args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+'''
+End-to-end consistency checks: short headless runs asserting that whole features still fit together (no window needed).
+
+Checks:
+    journal_resume  - a run recorded in a journal, saved, loaded and resumed (same journal) replays with every state hash matching,
+                      and a save whose journal doesn't lead to it starts a new journal (from the save) that replays as well
+    levels          - a headless run goes down and back up (descend -> ascend -> descend) and finds each level as it left it,
+                      with the player back where it stood (the level left first is evicted to disk on the way)
+    turn_order      - actors at different speeds get turns in proportion to them while the player waits
+                      (a speed 200 actor moves twice per player turn, a troll 3 times every 4)
+
+Usage:
+    >> python checks.py                         (every check, exits with status 1 if any failed)
+    >> python checks.py --checks journal_resume,levels
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import argparse
+from collections import Counter
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import traceback
+from typing import (Callable, Dict, List, Tuple)
+
+import numpy as np
+
+from actions import WaitAction
+from engine import Engine
+from entity import (Actor, Entity)
+import entity_factories
+from game_map import GameMap
+from headless import (HeadlessGame, random_walk)
+from journal import (JournalWriter, journal_for_save, replay, start_directory)
+from level_manager import LevelManager
+from savegame import (load_game, save_game)
+from scheduler import NORMAL_SPEED
+import tile_types
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+SEED = 16
+
+
+
+#_______________________________________________________________________// FUNCTIONS
+
+def expect(condition: bool, message: str) -> None:
+    '''
+    Fails the running check with 'message' unless 'condition' holds.
+    '''
+    if not condition:
+        raise AssertionError(message)
+
+
+
+def check_journal_resume(turns: int = 50, saves: int = 8) -> None:
+    '''
+    Records a run that is saved, loaded and resumed in the same journal every 'turns' turns, then replays the whole journal.
+    Then cuts the journal short (it no longer leads to the save) and checks the resumed run gets a new, replayable journal.
+    '''
+    with tempfile.TemporaryDirectory(prefix="check-") as directory:
+        path = os.path.join(directory, "run.rgj")
+        save_directory = os.path.join(directory, "save")
+
+        game = HeadlessGame(seed=SEED)
+        game.engine.journal = journal = JournalWriter.create(path, SEED, game.params)
+        game.run(random_walk, turns)
+
+        # Resumed in the same journal each time: the replay goes from the seed through every save and on
+        for _ in range(saves):
+            save_game(game.engine, save_directory)
+            journal.close()
+            game.engine = load_game(save_directory)
+            game.engine.update_fov()
+            game.engine.journal = journal = journal_for_save(path, save_directory, seed=0, params=game.params)
+            expect(not os.path.isdir(start_directory(path)), "a journal that led to the save wasn't resumed")
+            game.run(random_walk, turns)
+        journal.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = replay(path)
+        expect(result.turns == journal.turns, f"replayed {result.turns} turns out of {journal.turns}")
+        expect(result.hashes_checked == journal.turns // journal.header.hash_interval, "state hashes were skipped")
+
+        # A journal missing the actions that led to the save (plus a record cut short) can't be resumed
+        save_game(game.engine, save_directory)
+        with open(path, "r+b") as file:
+            file.truncate(os.path.getsize(path) - 10)
+
+        game.engine = load_game(save_directory)
+        game.engine.update_fov()
+        game.engine.journal = journal = journal_for_save(path, save_directory, seed=1, params=game.params)
+        expect(os.path.isdir(start_directory(path)) and journal.turns == 0, "a journal that didn't lead to the save was resumed")
+        game.run(random_walk, turns * saves)
+        journal.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = replay(path)
+        expect(result.turns == journal.turns, f"replayed {result.turns} turns out of {journal.turns} from the save")
+
+
+
+def check_levels(turns: int = 30) -> None:
+    '''
+    Plays a while on each level, goes down to depth 3, back up to depth 1, and down to depth 2 again,
+    checking that each level (tiles and entities) and the player's position on it are the ones it left.
+    (The player itself isn't compared: its hp may change on the levels in between.)
+    '''
+    game = HeadlessGame(seed=SEED)
+    engine = game.engine
+    # (Only one level left behind stays in memory: going back to depth 1 reads it back from disk)
+    engine.levels = LevelManager(engine, capacity=1)
+
+    # State of each level as the player left it: its tiles, every other entity (name, position, hp), and the player's position
+    left = {}
+
+    def level_state() -> Tuple[bytes, List[Tuple[str, int, int, int]], Tuple[int, int]]:
+        entities = sorted(
+            (entity.name, entity.x, entity.y, entity.fighter.hp if isinstance(entity, Actor) else 0)
+            for entity in engine.game_map.entities if entity is not engine.player
+        )
+        return np.ascontiguousarray(engine.game_map.tiles).tobytes(), entities, (engine.player.x, engine.player.y)
+
+    def leave() -> None:
+        left[engine.depth] = level_state()
+
+    def arrive(depth: int) -> None:
+        expect(engine.depth == depth, f"on depth {engine.depth}, expected {depth}")
+        expect(level_state() == left[depth], f"depth {depth} wasn't restored as it was left")
+
+    try:
+        for _ in range(2):
+            game.run(random_walk, turns)
+            leave()
+            engine.descend()
+
+        game.run(random_walk, turns)
+        leave()
+        engine.ascend()
+        arrive(2)
+        engine.ascend()
+        arrive(1)
+
+        try:
+            engine.ascend()
+        except ValueError:
+            pass
+        else:
+            expect(False, "went above depth 1")
+
+        engine.descend()
+        arrive(2)
+
+    finally:
+        game.close()
+
+
+
+def check_turn_order(player_turns: int = 4) -> None:
+    '''
+    Puts a fast orc (speed 200), an orc and a troll in sight of the player on open ground, lets the player wait,
+    and counts the steps each of them takes toward the player (they start too far away to reach it).
+    '''
+    player = entity_factories.player.clone()
+    engine = Engine(player=player)
+    # (Everyone stays in view, so they all chase the player)
+    engine.fov_radius = 20
+
+    game_map = GameMap(engine, 40, 24)
+    game_map.tiles[1:-1, 1:-1] = tile_types.dirt
+    engine.game_map = game_map
+    player.place(30, 12, game_map)
+
+    fast_orc = entity_factories.orc.clone()
+    fast_orc.speed = NORMAL_SPEED * 2
+    actors = {
+        "fast orc": (fast_orc.spawn(game_map, 18, 4), 2 * player_turns),
+        "orc":      (entity_factories.orc.spawn(game_map, 18, 12), player_turns),
+        "troll":    (entity_factories.troll.spawn(game_map, 18, 20), player_turns * 3 // 4),
+    }
+    engine.update_fov()
+    # (Woken actors act right away: let that first turn pass before counting)
+    engine.handle_player_action(WaitAction(player))
+
+    # Count every step taken (each one re-indexes the actor on the map)
+    steps: Counter[Entity] = Counter()
+    move_entity = game_map.move_entity
+
+    def count_step(entity: Entity, old_x: int, old_y: int) -> None:
+        steps[entity] += 1
+        move_entity(entity, old_x, old_y)
+
+    game_map.move_entity = count_step     # type: ignore
+    for _ in range(player_turns):
+        engine.handle_player_action(WaitAction(player))
+
+    for name, (actor, expected) in actors.items():
+        expect(steps[actor] == expected, f"{name} took {steps[actor]} steps in {player_turns} player turns (expected {expected})")
+
+
+
+# Every check, by name
+CHECKS: Dict[str, Callable[[], None]] = {
+    "journal_resume":   check_journal_resume,
+    "levels":           check_levels,
+    "turn_order":       check_turn_order,
+}
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run end-to-end consistency checks headlessly.")
+    parser.add_argument("--checks", default=",".join(CHECKS), help="comma separated: " + ",".join(CHECKS))
+    args = parser.parse_args()
+
+    failures = 0
+    for name in args.checks.split(","):
+        # (Scripted policies draw from the 'random' module)
+        random.seed(SEED)
+        try:
+            CHECKS[name]()
+        except Exception:
+            failures += 1
+            print(f"FAILED {name}")
+            traceback.print_exc()
+        else:
+            print(f"ok     {name}")
+
+    if failures:
+        sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+'''
+Chunked, lazily loaded world map: an overworld far bigger than memory, split into fixed-size square chunks.
+
+Only a window of (2 * radius + 1) x (2 * radius + 1) chunks around the player is kept loaded, as one ordinary GameMap.
+Inside the window everything works like any other map - 'tiles[...]', 'visible', 'explored', 'in_bounds()', the entity
+indexes, FOV, pathfinding, the enemy phase and rendering all use window ("local") coordinates.
+
+When the player steps out of the window's center chunk, the window slides by whole chunks ('ChunkedGameMap.follow()'):
+    - Chunks left behind are evicted to disk: their tiles, explored area and entities (as 'savegame.py' records).
+    - The arrays are shifted, and every remaining entity (and its cached AI path) is moved into the new local frame.
+    - Chunks coming into range are loaded from disk if they were visited before, or generated
+      (by default with 'procgen.generate_chunk_layout()', seeded per chunk, so the world is the same every time).
+
+World position = local position + 'ChunkedGameMap.origin'. Each chunk on disk is a directory of '.npy' files:
+
+    <directory>/<chunk x>_<chunk y>/tiles.npy       - the chunk's tiles
+    <directory>/<chunk x>_<chunk y>/explored.npy    - the chunk's explored area
+    <directory>/<chunk x>_<chunk y>/entities.npy    - 'savegame.entity_datatype' records (world coordinates)
+    <directory>/<chunk x>_<chunk y>/paths.npy       - their cached AI paths (world coordinates)
+
+Usage:
+    >> engine.game_map = generate_overworld(engine, seed=1)     (puts the engine's player in chunk (0, 0))
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import functools
+import os
+import shutil
+import tempfile
+from typing import (Callable, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING)
+
+import numpy as np
+
+import entity_factories
+from game_map import GameMap
+from procgen import (DungeonLayout, SPAWN_KINDS, generate_chunk_layout)
+from savegame import (entity_records, restore_entity)
+import tile_types
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from entity import Entity
+
+
+
+#_______________________________________________________________________// DECLARATION
+
+# Generates the layout of the chunk at the given chunk coordinates (spawn positions relative to the chunk's corner)
+ChunkGenerator = Callable[[int, int], DungeonLayout]
+
+
+
+#_______________________________________________________________________// CLASS
+
+class ChunkedGameMap(GameMap):
+    '''
+    A GameMap over a window of loaded chunks, sliding over an endless world as the player moves.
+    - 'generator' builds chunks that were never visited (defaults to 'procgen.generate_chunk_layout()' with 'seed').
+    - 'directory' is where evicted chunks are written (one world per directory, defaults to a new temporary directory,
+      deleted by '.close()').
+    - 'view_width'/'view_height' is the size of the area drawn around the player by '.render()'.
+    Nothing is loaded until '.load_window()' (or 'generate_overworld()') is called.
+    '''
+
+    def __init__(
+        self,
+        engine:         Engine,
+        seed:           int = 0,
+        chunk_size:     int = 32,
+        radius:         int = 1,
+        directory:      Optional[str] = None,
+        generator:      Optional[ChunkGenerator] = None,
+        view_width:     int = 80,
+        view_height:    int = 45,
+    ):
+        size = (2 * radius + 1) * chunk_size
+        super().__init__(engine, size, size)
+
+        self.chunk_size = chunk_size
+        self.radius = radius
+        self.generator = generator or functools.partial(generate_chunk_layout, seed=seed, chunk_size=chunk_size)
+        # A temporary directory created here is owned by the map (a given one is left on disk, to be reopened)
+        self.owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="world-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.view_width = min(view_width, size)
+        self.view_height = min(view_height, size)
+
+        # Chunk coordinates of the window's top-left chunk, and whether the window holds any chunks yet
+        self.corner = (0, 0)
+        self.loaded = False
+
+
+    @property
+    def origin(self) -> Tuple[int, int]:
+        '''
+        Returns the world position of the window's (0, 0) tile.
+        '''
+        return self.corner[0] * self.chunk_size, self.corner[1] * self.chunk_size
+
+
+    def to_world(self, x: int, y: int) -> Tuple[int, int]:
+        origin_x, origin_y = self.origin
+        return x + origin_x, y + origin_y
+
+
+    def to_local(self, world_x: int, world_y: int) -> Tuple[int, int]:
+        origin_x, origin_y = self.origin
+        return world_x - origin_x, world_y - origin_y
+
+
+    def window_chunks(self, corner: Optional[Tuple[int, int]] = None) -> Iterator[Tuple[int, int]]:
+        '''
+        Yields the chunk coordinates of every chunk in the window (or in a window with its top-left chunk at 'corner').
+        '''
+        corner_x, corner_y = corner or self.corner
+        span = 2 * self.radius + 1
+        for chunk_x in range(corner_x, corner_x + span):
+            for chunk_y in range(corner_y, corner_y + span):
+                yield chunk_x, chunk_y
+
+
+    def chunk_box(self, chunk_x: int, chunk_y: int) -> Tuple[slice, slice]:
+        '''
+        Returns the window area (pair of slices) covered by a loaded chunk.
+        '''
+        x = (chunk_x - self.corner[0]) * self.chunk_size
+        y = (chunk_y - self.corner[1]) * self.chunk_size
+        return slice(x, x + self.chunk_size), slice(y, y + self.chunk_size)
+
+
+    def chunk_path(self, chunk_x: int, chunk_y: int) -> str:
+        return os.path.join(self.directory, f"{chunk_x}_{chunk_y}")
+
+
+    def load_window(self, center_x: int, center_y: int) -> None:
+        '''
+        Loads (or generates) every chunk of the window centered on the chunk at (center_x, center_y), replacing whatever was loaded.
+        '''
+        if self.loaded:
+            for chunk in self.window_chunks():
+                self._evict_chunk(*chunk)
+
+        self.corner = (center_x - self.radius, center_y - self.radius)
+        for chunk in self.window_chunks():
+            self._load_chunk(*chunk)
+
+        self.loaded = True
+        self._reset_fov()
+
+
+    def follow(self, entity: Entity) -> None:
+        '''
+        Slides the window (by whole chunks) once the entity (the player) leaves the window's center chunk.
+        '''
+        shift_x = entity.x // self.chunk_size - self.radius
+        shift_y = entity.y // self.chunk_size - self.radius
+        if shift_x == shift_y == 0:
+            return
+
+        new_corner = (self.corner[0] + shift_x, self.corner[1] + shift_y)
+        old_chunks: Set[Tuple[int, int]] = set(self.window_chunks())
+        new_chunks: Set[Tuple[int, int]] = set(self.window_chunks(new_corner))
+
+        # Evict the chunks left behind (in the old frame), then move everything else into the new one
+        for chunk in old_chunks - new_chunks:
+            self._evict_chunk(*chunk)
+
+        dx, dy = shift_x * self.chunk_size, shift_y * self.chunk_size
+        self.tiles = _shifted(self.tiles, dx, dy, tile_types.wall)
+        self.explored = _shifted(self.explored, dx, dy, False)
+        self._shift_entities(dx, dy)
+        self.corner = new_corner
+
+        for chunk in new_chunks - old_chunks:
+            self._load_chunk(*chunk)
+
+        self._reset_fov()
+
+
+    def flush(self) -> None:
+        '''
+        Writes every loaded chunk to disk (without unloading it), so the whole world so far is on disk.
+        '''
+        for chunk in self.window_chunks():
+            self._write_chunk(*chunk, self._entities_in(self.chunk_box(*chunk)))
+
+
+    def close(self) -> None:
+        '''
+        Deletes the world's directory if the map created it (a given directory is kept, with whatever was evicted to it).
+        '''
+        if self.owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+
+    def viewport(self) -> Tuple[slice, slice]:
+        '''
+        Returns the 'view_width' x 'view_height' area centered on the player (kept inside the window).
+        '''
+        player = self.engine.player
+        left = min(max(0, player.x - self.view_width // 2), self.width - self.view_width)
+        top = min(max(0, player.y - self.view_height // 2), self.height - self.view_height)
+
+        return slice(left, left + self.view_width), slice(top, top + self.view_height)
+
+
+    def _entities_in(self, box: Tuple[slice, slice]) -> List[Entity]:
+        # Entities standing inside a window area (minus the player, who never gets evicted), found from the store's columns
+        store = self.store
+        rows = np.flatnonzero(store.in_use[: store.size])
+        x, y = store.x[rows], store.y[rows]
+        rows = rows[(x >= box[0].start) & (x < box[0].stop) & (y >= box[1].start) & (y < box[1].stop)]
+
+        return [store.entities[row] for row in rows.tolist() if store.entities[row] is not self.engine.player]
+
+
+    def _write_chunk(self, chunk_x: int, chunk_y: int, entities: List[Entity]) -> None:
+        # Stage the chunk's files in a temporary directory and swap it into place (a half-written chunk is never read)
+        box = self.chunk_box(chunk_x, chunk_y)
+        records, paths = entity_records(self, entities)
+        origin_x, origin_y = self.origin
+        records["x"] += origin_x
+        records["y"] += origin_y
+        paths += np.array((origin_x, origin_y), dtype=paths.dtype)
+
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        np.save(os.path.join(staging, "tiles.npy"), self.tiles[box])
+        np.save(os.path.join(staging, "explored.npy"), self.explored[box])
+        np.save(os.path.join(staging, "entities.npy"), records)
+        np.save(os.path.join(staging, "paths.npy"), paths)
+
+        path = self.chunk_path(chunk_x, chunk_y)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(staging, path)
+
+
+    def _evict_chunk(self, chunk_x: int, chunk_y: int) -> None:
+        # Write a loaded chunk to disk and take its entities off the map
+        entities = self._entities_in(self.chunk_box(chunk_x, chunk_y))
+        self._write_chunk(chunk_x, chunk_y, entities)
+        for entity in entities:
+            self.remove_entity(entity)
+
+
+    def _load_chunk(self, chunk_x: int, chunk_y: int) -> None:
+        # Fill a chunk's window area from disk (visited before) or from the generator (new), and place its entities
+        box = self.chunk_box(chunk_x, chunk_y)
+        left, top = box[0].start, box[1].start
+        path = self.chunk_path(chunk_x, chunk_y)
+
+        if not os.path.isdir(path):
+            layout = self.generator(chunk_x, chunk_y)
+            self.tiles[box] = layout.tiles
+            self.explored[box] = False
+
+            for kind, (x, y) in zip(layout.spawn_kinds.tolist(), layout.spawn_xy.tolist()):
+                name = SPAWN_KINDS[kind]
+                # (The chunk's "player" spawn is only a possible starting point, see 'generate_overworld()')
+                if name != "player":
+                    getattr(entity_factories, name).spawn(self, left + x, top + y)
+            return
+
+        self.tiles[box] = np.load(os.path.join(path, "tiles.npy"))
+        self.explored[box] = np.load(os.path.join(path, "explored.npy"))
+
+        origin_x, origin_y = self.origin
+        paths = np.load(os.path.join(path, "paths.npy"))
+        paths -= np.array((origin_x, origin_y), dtype=paths.dtype)
+        for record in np.load(os.path.join(path, "entities.npy")):
+            entity = restore_entity(record, paths)
+            entity.place(entity.x - origin_x, entity.y - origin_y, self)
+            self._clip_path(entity)
+
+
+    def _shift_entities(self, dx: int, dy: int) -> None:
+        # Move every entity (positions, spatial index, store columns, cached AI paths) into a window shifted by (dx, dy) tiles
+        store = self.store
+        rows = np.flatnonzero(store.in_use[: store.size])
+        store.x[rows] -= dx
+        store.y[rows] -= dy
+
+        self.entity_locations = {(x - dx, y - dy): occupants for (x, y), occupants in self.entity_locations.items()}
+
+        offset = np.array((dx, dy), dtype=np.intc)
+        for entity in self.entities:
+            entity.x -= dx
+            entity.y -= dy
+            ai = getattr(entity, "ai", None)
+            path = getattr(ai, "path", None)
+            if path is not None and len(path):
+                ai.path = path - offset     # type: ignore
+                self._clip_path(entity)
+
+        # Dormant actors are filed by position
+        self.dormant.rebuild()
+
+
+    def _clip_path(self, entity: Entity) -> None:
+        # A cached AI path that leaves the window (through an unloaded chunk) is dropped, the AI repaths once it sees the player
+        ai = getattr(entity, "ai", None)
+        path = getattr(ai, "path", None)
+        if path is None or not len(path):
+            return
+
+        if (path >= 0).all() and (path[:, 0] < self.width).all() and (path[:, 1] < self.height).all():
+            return
+
+        ai.path = path[:0]      # type: ignore
+        ai.path_step = 0        # type: ignore
+
+
+    def _reset_fov(self) -> None:
+        # Tiles and local coordinates changed: drop the cached FOV and recompute it in the new frame
+        self.visible = np.full((self.width, self.height), fill_value=False, order="F")
+        self.fov_key = None
+        self.fov_box = None
+        self.mark_tiles_changed()
+
+        if getattr(self.engine, "game_map", None) is self and self.engine.player.store_index >= 0:
+            self.engine.update_fov()
+
+
+
+#_______________________________________________________________________// FUNCTIONS
+
+def _shifted(array: np.ndarray, dx: int, dy: int, fill_value) -> np.ndarray:
+    '''
+    Returns a copy of a window array moved by (-dx, -dy): what was at (x, y) is now at (x - dx, y - dy), and the uncovered area is 'fill_value'.
+    '''
+    width, height = array.shape
+    shifted = np.full_like(array, fill_value)
+    shifted[max(-dx, 0): width - max(dx, 0), max(-dy, 0): height - max(dy, 0)] = \
+        array[max(dx, 0): width + min(dx, 0), max(dy, 0): height + min(dy, 0)]
+
+    return shifted
+
+
+
+def generate_overworld(
+    engine:     Engine,
+    seed:       int,
+    chunk_size: int = 32,
+    radius:     int = 1,
+    directory:  Optional[str] = None,
+) -> ChunkedGameMap:
+    '''
+    Builds a chunked overworld around chunk (0, 0) and places the engine's player on that chunk's starting point.
+    '''
+    world = ChunkedGameMap(engine, seed=seed, chunk_size=chunk_size, radius=radius, directory=directory)
+    world.load_window(0, 0)
+
+    # The generator's "player" spawn for chunk (0, 0), moved into the window
+    layout = world.generator(0, 0)
+    x, y = layout.spawn_xy[layout.spawn_kinds == SPAWN_KINDS.index("player")][0].tolist()
+    box = world.chunk_box(0, 0)
+    engine.player.place(box[0].start + x, box[1].start + y, world)
+
+    return world
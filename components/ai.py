@@ -14,12 +14,12 @@ EX: If a piece of terrain takes longer to traverse- whether because the tile inh
 #_______________________________________________________________________// MODULES
 
 from __future__ import annotations
-from typing import (List, Tuple, TYPE_CHECKING)
+from typing import (List, Optional, Tuple, TYPE_CHECKING)
 
 import numpy as np                  # type: ignore
 import tcod
 
-from actions import (Action, MeleeAction, MovementAction, WaitAction)
+from actions import (Action, MeleeAction, MovementAction)
 from components.base_component import BaseComponent
 
 if TYPE_CHECKING:
@@ -27,6 +27,14 @@ if TYPE_CHECKING:
 
 
 
+#_______________________________________________________________________// DECLARATION
+
+# Shared (read-only) empty path, so a new AI doesn't allocate an array until it actually has somewhere to go
+EMPTY_PATH = np.empty((0, 2), dtype=np.intc)
+EMPTY_PATH.flags.writeable = False
+
+
+
 #_______________________________________________________________________// CLASS
 
 class BaseAI(Action, BaseComponent):
@@ -36,26 +44,42 @@ class BaseAI(Action, BaseComponent):
     # Reference all the 'Actor' class attributes
     entity: Actor
 
+    # 'True' while this AI has something to do even when the player can't see it.
+    # The engine's batched enemy phase skips unseen AIs that aren't pursuing (mirrored in the 'EntityStore.pursuing' column).
+    pursuing = True
+
+    # (No slots of its own; the 'entity' slot comes from 'Action')
+    __slots__ = ()
+
     
     def perform(self) -> None:
         raise NotImplementedError()
 
 
+    def act(self, dx: int, dy: int, distance: int, visible: bool) -> Optional[Action]:
+        '''
+        Takes this AI's turn with the decision inputs already worked out by the engine's batched enemy phase:
+        - dx/dy: offset to the player, 'distance': Chebyshev distance to the player, 'visible': whether the player can see this entity.
+        Returns the action taken ('None' for waiting), whose 'cost' decides when this AI's next turn comes up.
+        By default the inputs are ignored and the AI's own 'perform()' runs (the AI is the action).
+        '''
+        self.perform()
+        return self
+
+
+    def hear(self, x: int, y: int) -> None:
+        '''
+        Called when a noise goes off within earshot at (x, y) (see 'Engine.make_noise()'). Ignored by default.
+        '''
+
+
     def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
         '''
         Compute and return a path to the target position. If there's no valid path, return an empty list.
         '''
-        # Copy the walkable array
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
-
-        # Loop through any entities registered on the given map
-        for entity in self.entity.gamemap.entities:
-            # Check that an entity blocks movement and the cost isn't zero (blocking)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
-                # Add to the cost of a blocked position
-                # A lower number means more enemies will crowd behind each other in hallways.
-                # A higher number means enemies will take longer paths in order to surround the player.
-                cost[entity.x, entity.y] += 10
+        self.engine.profiler.count("paths")
+        # Walkable tiles plus extra cost for tiles occupied by blocking entities
+        cost = self.entity.gamemap.get_path_cost()
 
         # Create a graph from the cost array and pass that graph to a new pathfinder
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
@@ -70,40 +94,163 @@ class BaseAI(Action, BaseComponent):
         return [(index[0], index[1]) for index in path]
 
 
+    def get_path_to_player(self) -> np.ndarray:
+        '''
+        Return a path to the player read from the engine's shared "distance-to-player" map (see 'Engine.get_chase_pathfinder()').
+        - Unlike 'get_path_to()', no new cost array or pathfinder is built, so any number of enemies share one search per turn.
+        - The path is returned as an (n, 2) array of x/y points (empty if the player can't be reached).
+        '''
+        self.engine.profiler.count("paths")
+        pathfinder = self.engine.get_chase_pathfinder()
+
+        # 'path_from' walks from this entity back to the root (the player); slice off the starting point
+        return pathfinder.path_from((self.entity.x, self.entity.y))[1:]
+
+
     
 class HostileEnemy(BaseAI):
     '''
     Extends 'BaseAI' component/class to add decision making for enemies. 
     Enemy will either attack, move toward the player, or wait for its next turn.
+
+    The path to the player is cached between turns and only recomputed when it goes stale:
+    - The player drifted too far from the path's end (tolerance grows with the length of the remaining path).
+    - A tile on the remaining path stopped being walkable, or the next step is occupied by another blocking entity.
     '''
+
+    # The player may drift (remaining path length / PATH_DRIFT_DIVISOR) tiles from the cached path's end before it's recomputed
+    PATH_DRIFT_DIVISOR = 4
+
+    __slots__ = ("path", "path_step", "_melee", "_movement")
     
     def __init__(self, entity: Actor):
         super().__init__(entity)
-        # Initialize and set a List (array) for the enemy's path
-        self.path: List[Tuple[int, int]] = []
+        # Cached path as an (n, 2) array of x/y points. Steps are consumed by advancing 'path_step' (O(1), no list shifting)
+        self.path: np.ndarray = EMPTY_PATH
+        self.path_step = 0
+        # This enemy's attack/step actions, created on first use and re-aimed every turn after that
+        self._melee: Optional[MeleeAction] = None
+        self._movement: Optional[MovementAction] = None
+
+
+    @property
+    def remaining_path(self) -> np.ndarray:
+        '''
+        Returns the part of the cached path that hasn't been walked yet. 
+        '''
+        return self.path[self.path_step:]
+
+
+    def path_is_clear(self) -> bool:
+        '''
+        Returns 'True' if every tile left on the cached path is still walkable and the next step isn't occupied by another blocking entity.
+        '''
+        remaining = self.remaining_path
+        if not len(remaining):
+            return False
+
+        gamemap = self.entity.gamemap
+        if not gamemap.tiles["walkable"][remaining[:, 0], remaining[:, 1]].all():
+            return False
+
+        next_x, next_y = remaining[0].tolist()
+        blocker = gamemap.get_blocking_entity_at_location(next_x, next_y)
+
+        return blocker is None or blocker is self.engine.player
+
+
+    def path_is_stale(self, target_x: int, target_y: int) -> bool:
+        '''
+        Returns 'True' if the cached path should be thrown away and recomputed to reach a target at (target_x, target_y).
+        '''
+        remaining = self.remaining_path
+        if not len(remaining):
+            return True
+
+        goal_x, goal_y = remaining[-1].tolist()
+        drift = max(abs(target_x - goal_x), abs(target_y - goal_y))
+
+        if drift > len(remaining) // self.PATH_DRIFT_DIVISOR:
+            return True
+
+        return not self.path_is_clear()
+
+    
+    @property
+    def pursuing(self) -> bool:
+        '''
+        Returns 'True' while there are steps left on the cached path (the enemy keeps following it while unseen).
+        '''
+        return self.path_step < len(self.path)
 
     
+    def hear(self, x: int, y: int) -> None:
+        '''
+        Heads for the noise, unless it's already following a path (the player is seen, or it's chasing a remembered position).
+        '''
+        if self.pursuing:
+            return
+
+        self.engine.profiler.count("paths")
+        self.path = self.engine.get_noise_pathfinder(x, y).path_from((self.entity.x, self.entity.y))[1:]
+        self.path_step = 0
+        if self.entity.store_index >= 0:
+            self.entity.gamemap.store.pursuing[self.entity.store_index] = self.pursuing
+
+
     def perform(self) -> None:
         '''
-        - If not in the player's vision, wait until next turn.
-        - If the player is right next to the enemy, attack the player.
-        - If the player sees the enemy, but the enemy is too far away to attack, move closer to the player.
+        Works out the offset/distance to the player and whether the player can see this enemy, then takes the turn with 'act()'.
         '''
         target = self.engine.player
         dx = target.x - self.entity.x
         dy = target.y - self.entity.y
         distance = max(abs(dx), abs(dy))    # "Chevyshev" distance
 
-        if self.engine.game_map.visible[self.entity.x, self.entity.y]:
+        return self.act(dx, dy, distance, self.engine.game_map.visible[self.entity.x, self.entity.y])
+
+
+    def act(self, dx: int, dy: int, distance: int, visible: bool) -> Optional[Action]:
+        '''
+        - If not in the player's vision, keep following the last known path (if it's still clear) or wait until next turn.
+        - If the player is right next to the enemy, attack the player.
+        - If the player sees the enemy, but the enemy is too far away to attack, move closer to the player.
+        Returns the attack/step taken ('None' when waiting).
+        '''
+        target = self.engine.player
+
+        if visible:
             if distance <= 1:
-                return MeleeAction(self.entity, dx, dy).perform()
+                if self._melee is None:
+                    self._melee = MeleeAction(self.entity, dx, dy)
+                self._melee.aim(dx, dy).perform()
+                return self._melee
+
+            # Update the enemy's path to chase after the player (only when the cached one went stale)
+            if self.path_is_stale(target.x, target.y):
+                self.path = self.get_path_to_player()
+                self.path_step = 0
+
+        elif not self.path_is_clear():
+            # The last known path is gone or blocked and the player can't be seen: give up on it
+            self.path_step = len(self.path)
+
+        action: Optional[Action] = None
+        if self.path_step < len(self.path):
+            dest_x, dest_y = self.path[self.path_step].tolist()
+            if self._movement is None:
+                self._movement = MovementAction(self.entity, 0, 0)
+            action = self._movement.aim(dest_x - self.entity.x, dest_y - self.entity.y)
+            action.perform()
+
+            # Only consume the step if the move actually happened (a failed move would leave the next step out of reach)
+            if self.entity.x == dest_x and self.entity.y == dest_y:
+                self.path_step += 1
 
-            # Update the enemy's path to chase after the player
-            self.path = self.get_path_to(target.x, target.y)
+        # (Otherwise wait until the next turn: waiting does nothing, so no 'WaitAction' is built for it)
 
-        if self.path:
-            dest_x, dest_y = self.path.pop(0)
-            return MovementAction(self.entity, dest_x - self.entity.x, dest_y - self.entity.y).perform()
+        # Let the engine's batched enemy phase know whether this enemy still has somewhere to go while unseen
+        if self.entity.store_index >= 0:
+            self.entity.gamemap.store.pursuing[self.entity.store_index] = self.pursuing
 
-        # Wait until the next turn
-        return WaitAction(self.entity).perform()
+        return action
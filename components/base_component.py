@@ -19,6 +19,9 @@ if TYPE_CHECKING:
 #_______________________________________________________________________// CLASS
 
 class BaseComponent:
+
+    # No slots of its own: subclasses declare theirs (so it can be mixed in with 'Action', which owns the 'entity' slot)
+    __slots__ = ()
  
     # References the entity that is invoking this class.
     entity: Entity
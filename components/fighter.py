@@ -29,6 +29,8 @@ class Fighter(BaseComponent):
 
     entity: Actor
 
+    __slots__ = ("entity", "max_hp", "_hp", "defense", "power")
+
     def __init__(self, hp: int, defense: int, power: int):
         self.max_hp     = hp            # Total available health
         self._hp        = hp            # Entity's current health
@@ -36,6 +38,20 @@ class Fighter(BaseComponent):
         self.power      = power         # Entity's attack power / damage dealt
 
     
+    def clone(self, entity: Actor) -> Fighter:
+        '''
+        Returns a copy of this fighter (same stats and current hp) attached to another entity. Used by 'Entity.clone()'.
+        '''
+        clone = Fighter.__new__(Fighter)
+        clone.max_hp    = self.max_hp
+        clone._hp       = self._hp
+        clone.defense   = self.defense
+        clone.power     = self.power
+        clone.entity    = entity
+
+        return clone
+
+    
     @property
     def hp(self) -> int:
         # Getter: returns the hp value of this entity
@@ -47,6 +63,10 @@ class Fighter(BaseComponent):
         # Setter: keeps hp from going outside the min/max possible health
         self._hp = max(0, min(value, self.max_hp))
 
+        # Mirror the new value into the map's entity store (prototypes that aren't on a map have no row)
+        if self.entity.store_index >= 0:
+            self.entity.gamemap.store.hp[self.entity.store_index] = self._hp
+
         if self._hp == 0 and self.entity.ai:
             self.die()
 
@@ -63,6 +83,10 @@ class Fighter(BaseComponent):
         else:
             death_message = f"{self.entity.name} is dead!"
 
+        # Take the entity off the map's indexes while its attributes change, then re-register it as a corpse
+        gamemap = self.entity.gamemap
+        gamemap.remove_entity(self.entity)
+
         # Set entity's new attributes:
         self.entity.char            = "%"
         self.entity.color           = (191, 0, 0)
@@ -71,4 +95,8 @@ class Fighter(BaseComponent):
         self.entity.name            = f"The twisted corpse of {self.entity.name}."
         self.entity.render_order    = RenderOrder.CORPSE
 
+        gamemap.add_entity(self.entity)
+        # The corpse (or the game over state) needs drawing
+        self.engine.dirty = True
+
         print(death_message)
\ No newline at end of file
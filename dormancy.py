@@ -0,0 +1,155 @@
+'''
+Dormant-actor culling: living actors far from the player are kept "dormant" and cost nothing per turn.
+
+Each GameMap has a 'DormantIndex' ('game_map.dormant') splitting its living actors (store rows) in two:
+    - awake:    the only rows the engine's enemy phase looks at, each with a turn in the map's 'TurnScheduler'.
+    - dormant:  kept in a coarse grid of 'BUCKET_SIZE' tiles, so "who is asleep around (x, y)" only visits the few
+                buckets overlapping that area, however many actors the level holds.
+
+Actors are added dormant ('GameMap.add_entity()'). The engine wakes them up when the player comes close, when they
+stand in the player's view, or when they hear a noise ('Engine.make_noise()'), and puts awake actors back to sleep
+once they're far away, out of view and not pursuing anything (see 'Engine.handle_enemy_turns()').
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+from typing import (Dict, Iterable, Optional, Set, Tuple, TYPE_CHECKING)
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from entity_store import EntityStore
+    from scheduler import TurnScheduler
+
+
+
+#_______________________________________________________________________// CLASS
+
+class DormantIndex:
+
+    # Width/height (in tiles) of a grid cell of the dormant index
+    BUCKET_SIZE = 16
+
+    def __init__(self, store: EntityStore, scheduler: TurnScheduler):
+        self.store = store
+        self.scheduler = scheduler
+        # Rows of living actors that take part in the enemy phase (woken rows get a turn right away, at the scheduler's current time)
+        self.awake: Set[int] = set()
+        # Dormant rows by grid cell, and each dormant row's cell
+        self.buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self.dormant: Dict[int, Tuple[int, int]] = {}
+        # Bumped whenever a row becomes dormant or a dormant row moves, so a wake-up check whose inputs
+        # (this, the player's position and FOV) haven't changed since last turn can be skipped (see 'Engine.handle_enemy_turns()')
+        self.changes = 0
+        self.checked: Optional[Tuple[int, ...]] = None
+
+
+    def __len__(self) -> int:
+        return len(self.dormant)
+
+
+    def _bucket_of(self, row: int) -> Tuple[int, int]:
+        return int(self.store.x[row]) // self.BUCKET_SIZE, int(self.store.y[row]) // self.BUCKET_SIZE
+
+
+    def add(self, row: int) -> None:
+        '''
+        Registers a living actor's row (asleep until something wakes it).
+        '''
+        self.sleep((row,))
+
+
+    def discard(self, row: int) -> None:
+        '''
+        Forgets a row (its entity left the map, or died).
+        '''
+        self.awake.discard(row)
+        self.scheduler.cancel(row)
+        bucket = self.dormant.pop(row, None)
+        if bucket is not None:
+            self._unbucket(row, bucket)
+
+
+    def _unbucket(self, row: int, bucket: Tuple[int, int]) -> None:
+        rows = self.buckets[bucket]
+        rows.discard(row)
+        if not rows:
+            del self.buckets[bucket]
+
+
+    def moved(self, row: int) -> None:
+        '''
+        Re-files a dormant row whose position changed (awake rows aren't filed by position, so they're skipped).
+        '''
+        bucket = self.dormant.get(row)
+        if bucket is None:
+            return
+
+        new_bucket = self._bucket_of(row)
+        if new_bucket != bucket:
+            self._unbucket(row, bucket)
+            self.buckets.setdefault(new_bucket, set()).add(row)
+            self.dormant[row] = new_bucket
+        self.changes += 1
+
+
+    def sleep(self, rows: Iterable[int]) -> None:
+        '''
+        Makes rows dormant (their scheduled turns are dropped).
+        '''
+        for row in rows:
+            self.awake.discard(row)
+            self.scheduler.cancel(row)
+            if row not in self.dormant:
+                bucket = self._bucket_of(row)
+                self.buckets.setdefault(bucket, set()).add(row)
+                self.dormant[row] = bucket
+                self.changes += 1
+
+
+    def wake(self, rows: Iterable[int]) -> None:
+        '''
+        Makes rows awake, scheduling a turn at the current time for each row that wasn't already.
+        '''
+        for row in rows:
+            bucket = self.dormant.pop(row, None)
+            if bucket is not None:
+                self._unbucket(row, bucket)
+            if row not in self.awake:
+                self.awake.add(row)
+                self.scheduler.schedule(row, self.scheduler.time)
+
+
+    def dormant_near(self, x: int, y: int, radius: int) -> np.ndarray:
+        '''
+        Returns the dormant rows within 'radius' tiles (Chebyshev distance) of (x, y), visiting only the overlapping grid cells.
+        '''
+        size = self.BUCKET_SIZE
+        found = [
+            row
+            for bucket_x in range((x - radius) // size, (x + radius) // size + 1)
+            for bucket_y in range((y - radius) // size, (y + radius) // size + 1)
+            for row in self.buckets.get((bucket_x, bucket_y), ())
+        ]
+        rows = np.array(sorted(found), dtype=np.intp)
+
+        return rows[self.store.distance_from(x, y, rows) <= radius]
+
+
+    def awake_rows(self) -> np.ndarray:
+        '''
+        Returns the awake rows in ascending order (so turn order stays deterministic).
+        '''
+        return np.array(sorted(self.awake), dtype=np.intp)
+
+
+    def rebuild(self) -> None:
+        '''
+        Re-files every dormant row from the store's positions (after positions were changed in bulk, ex: a chunked map shifting).
+        '''
+        rows = list(self.dormant)
+        self.buckets.clear()
+        self.dormant.clear()
+        self.sleep(rows)
@@ -19,18 +19,29 @@ The engine "render" function in sequence:
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import time
+from typing import (Dict, Optional, Set, Tuple, TYPE_CHECKING)
 
+import numpy as np
+import tcod
 from tcod.context import Context
 from tcod.console import Console
 from tcod.map import compute_fov
 
+from actions import WaitAction
 from input_handlers import MainGameEventHandler
+from procgen import build_dungeon
+from profiler import Profiler
+from scheduler import (TURN_COST, duration)
 
 if TYPE_CHECKING:
+    from actions import Action
     from entity import Actor
     from game_map import GameMap
     from input_handlers import EventHandler
+    from journal import JournalWriter
+    from level_manager import LevelManager
+    from pregen import LevelPregenerator
 
 
 
@@ -40,19 +51,269 @@ class Engine:
 
     game_map: GameMap
 
+    # How far the player can see (in tiles)
+    fov_radius = 8
+    # Dormant actors this close to the player wake up, awake ones further than 'sleep_radius' (unseen, not pursuing) go dormant.
+    # (The gap between the two keeps an actor on the edge from waking and dozing off every other turn.)
+    wake_radius = 12
+    sleep_radius = 20
+
     # Initialize
     # (Expects a set of entities, an event handler, a map, and a separate reference to the player entity)
     def __init__(self, player: Actor):
         # The engine listens for events and updates the game map and player state (location and FOV) accordingly.
         self.event_handler: EventHandler = MainGameEventHandler(self)
         self.player = player
+        # Shared "distance-to-player" map for the current enemy phase (built on demand by 'get_chase_pathfinder()')
+        self._chase_pathfinder: Optional[tcod.path.Pathfinder] = None
+        # Same, rooted at the noises made this turn (see 'make_noise()'), and the noises already heard (one hearing per spot)
+        self._noise_pathfinders: Dict[Tuple[int, int], tcod.path.Pathfinder] = {}
+        self._noises: Set[Tuple[int, int]] = set()
+        # Dungeon level the player is on, and (optionally) the process pool generating the levels below it
+        self.depth = 1
+        self.pregenerator: Optional[LevelPregenerator] = None
+        # (Optionally) keeps the levels the player left, so they can be gone back to
+        self.levels: Optional[LevelManager] = None
+        # 'True' when something visible changed since the last frame (the main loop only renders dirty frames)
+        self.dirty = True
+        # Phase timers and counters (off until enabled, ex: with the F3 key)
+        self.profiler = Profiler()
+        # (Optionally) records every player action, so the run can be replayed (see 'journal.py')
+        self.journal: Optional[JournalWriter] = None
+
+
+    def handle_player_action(self, action: Action) -> None:
+        '''
+        Performs the player's action, then the enemies take their turns and the player's FOV is updated before the next action.
+        The enemies get every turn that comes up while the player's action lasts (its 'cost' at the player's 'speed').
+        (Shared by the main game's event handler and the headless simulation.)
+        '''
+        profiler = self.profiler
+        with profiler.phase("player_action"):
+            action.perform()
+            # (Lets a chunked map load/unload the area around the player before anyone else acts)
+            self.game_map.follow(self.player)
+
+        with profiler.phase("enemy_turns"):
+            self.handle_enemy_turns(duration(action.cost, self.player.speed))
+
+        with profiler.phase("fov"):
+            self.update_fov()
+
+        profiler.end_turn()
+
+        if self.journal is not None:
+            self.journal.record(action, self)
+
+        # The player and/or enemies may have moved, attacked or died: the frame needs redrawing
+        self.dirty = True
+
+
+    def descend(self) -> None:
+        '''
+        Moves the player down to the next level.
+        '''
+        self.change_level(self.depth + 1)
+
+
+    def ascend(self) -> None:
+        '''
+        Moves the player back up to the previous level (there's none above depth 1).
+        '''
+        self.change_level(self.depth - 1)
+
+
+    def change_level(self, depth: int) -> None:
+        '''
+        Moves the player to the level at 'depth'.
+        - With a level manager ('levels'), the current level is handed to it, and a level visited before is restored from it
+          (from memory, or read back from disk) with the player back where they left it.
+        - A new level is built from the pregenerator's next layout: instant if the worker process already finished that level,
+          otherwise it only waits for the rest of its generation.
+        Raises 'ValueError' for a depth above the first level (depth 1).
+        '''
+        if depth < 1:
+            raise ValueError(f"There's no level at depth {depth} (the dungeon starts at depth 1).")
+
+        revisit = self.levels is not None and depth in self.levels
+        if not revisit and self.pregenerator is None:
+            raise RuntimeError("Engine.change_level() needs a 'pregenerator' to take a new level from.")
+
+        if self.levels is not None:
+            self.levels.leave(self.depth, self.game_map)
+
+        restored = self.levels.restore(depth) if revisit else None     # type: ignore
+        if restored is not None:
+            self.game_map, (x, y) = restored
+            self.player.place(x, y, self.game_map)
+        else:
+            self.game_map = build_dungeon(self.pregenerator.next_layout(), self)   # type: ignore
+
+        self.depth = depth
+        self.update_fov()
+
+
+    def handle_enemy_turns(self, elapsed: int = TURN_COST) -> None:
+        '''
+        Batched enemy phase, run while the player's last action lasts ('elapsed' time units, see 'scheduler.py').
+        Only awake actors take part (see 'dormancy.py'), so its cost follows the number of actors around the player:
+        - Dormant actors within 'wake_radius' of the player, or standing in view, are woken first (a lookup around the player).
+        - Awake actors beyond 'sleep_radius' that are unseen and not pursuing anything go dormant (they'd only have waited).
+        The map's scheduler then hands out every turn that comes up before the map's clock reaches the player's next action,
+        one time step at a time: all actors whose turn comes at the same time act together in a batch ('_take_turns()').
+        (At normal speed every awake actor gets exactly one turn per player action; faster ones get more, slower ones fewer.)
+        '''
+        # The player has acted (and maybe moved) since the last enemy phase, so the old distance map is stale
+        self._chase_pathfinder = None
+        self._noise_pathfinders.clear()
+        self._noises.clear()
+
+        game_map = self.game_map
+        store = game_map.store
+        dormant = game_map.dormant
+        scheduler = game_map.scheduler
+        player_x, player_y = self.player.x, self.player.y
+
+        # (Dormant actors don't move: if neither the player, its view nor the dormant rows changed, nobody new can be woken)
+        checked = (player_x, player_y, game_map.fov_key, dormant.changes)
+        if checked != dormant.checked:
+            nearby = dormant.dormant_near(player_x, player_y, max(self.wake_radius, self.fov_radius))
+            if len(nearby):
+                close = store.distance_from(player_x, player_y, nearby) <= self.wake_radius
+                dormant.wake(nearby[close | game_map.visible[store.x[nearby], store.y[nearby]]].tolist())
+            dormant.checked = checked
+
+        until = scheduler.time + elapsed
+        while True:
+            now, rows = scheduler.pop_due(until)
+            if not rows:
+                break
+            scheduler.time = now
+            self._take_turns(np.array(rows, dtype=np.intp))
+
+        scheduler.time = until
+
+
+    def _take_turns(self, rows: np.ndarray) -> None:
+        '''
+        Takes the turns of actors whose turn came up at the same time ('rows', in the order they were scheduled).
+        The decision inputs for all of them are computed at once from the map's 'EntityStore':
+        - offset and Chebyshev distance to the player, and whether the player can see the actor.
+        Actors are then split into groups:
+        - attack: visible and adjacent to the player.
+        - move: visible but further away, or unseen but still 'pursuing' a remembered path.
+        - wait: everyone else. 'WaitAction' does nothing, so this group is only rescheduled.
+        Attackers act first, then movers closest to the player first, so the front of a crowd steps forward 
+        before the actors queued behind it try to take those tiles (a mover whose tile is still taken just doesn't move).
+        Each actor's next turn is scheduled after the 'cost' of the action it took, at its 'speed'.
+        '''
+        game_map = self.game_map
+        store = game_map.store
+        dormant = game_map.dormant
+        scheduler = game_map.scheduler
+        now = scheduler.time
+
+        dx = self.player.x - store.x[rows]
+        dy = self.player.y - store.y[rows]
+        distance = np.maximum(np.abs(dx), np.abs(dy))
+        visible = game_map.visible[store.x[rows], store.y[rows]]
+        pursuing = store.pursuing[rows]
+
+        asleep = (distance > self.sleep_radius) & ~visible & ~pursuing
+        dormant.sleep(rows[asleep].tolist())
+
+        attack = visible & (distance <= 1)
+        move = (visible & (distance > 1)) | (~visible & pursuing)
+
+        # Waiting takes time too
+        waiters = rows[~(attack | move | asleep)]
+        for row, speed in zip(waiters.tolist(), store.speed[waiters].tolist()):
+            scheduler.schedule(row, now + duration(WaitAction.cost, speed))
+
+        # Closest movers first ('stable' keeps ties in scheduling order, so turn order is deterministic)
+        movers = np.flatnonzero(move)
+        movers = movers[np.argsort(distance[movers], kind="stable")]
+        order = np.concatenate((np.flatnonzero(attack), movers))
+
+        # Resolve the handles before anyone acts (a death frees and re-registers a row mid-phase)
+        acting = rows[order].tolist()
+        actors = [store.entities[row] for row in acting]
+        turns = zip(acting, actors, dx[order].tolist(), dy[order].tolist(), distance[order].tolist(), visible[order].tolist())
+
+        profiler = self.profiler
+        profiler.count("entities_scanned", len(rows))
+        timed = profiler.enabled
+
+        for row, actor, dx_, dy_, distance_, visible_ in turns:
+            ai = actor.ai
+            if not ai:
+                continue
+
+            if timed:
+                # Time every AI's turn under its class name
+                start = time.perf_counter()
+                action = ai.act(dx_, dy_, distance_, visible_)
+                profiler.record(f"ai.{type(ai).__name__}", time.perf_counter() - start)
+            else:
+                action = ai.act(dx_, dy_, distance_, visible_)
+
+            # (Unless it died or fell asleep meanwhile: then it has no next turn)
+            if row in dormant.awake and actor.store_index == row:
+                scheduler.schedule(row, now + duration((action or WaitAction).cost, actor.speed))
+
+
+    def make_noise(self, x: int, y: int, radius: int) -> None:
+        '''
+        A noise at (x, y): dormant actors within 'radius' tiles wake up, and every awake AI in range hears where it came from
+        (see 'BaseAI.hear()').
+        - A fight makes the same noise every attack: a spot already heard since the last enemy phase started is ignored.
+        '''
+        if (x, y) in self._noises:
+            return
+        self._noises.add((x, y))
+
+        game_map = self.game_map
+        store = game_map.store
+        dormant = game_map.dormant
+        dormant.wake(dormant.dormant_near(x, y, radius).tolist())
+
+        rows = dormant.awake_rows()
+        rows = rows[store.distance_from(x, y, rows) <= radius]
+        for actor in [store.entities[row] for row in rows.tolist()]:
+            if actor.ai:
+                actor.ai.hear(x, y)
 
 
-    def handle_enemy_turns(self)-> None:
-        # Go through all actors on a given game map (minus the player actor)
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                entity.ai.perform()
+    def get_chase_pathfinder(self) -> tcod.path.Pathfinder:
+        '''
+        Returns a pathfinder rooted at the player (a "distance-to-player" map), built at most once per enemy phase. 
+        - Every 'HostileEnemy' reads its next step from this one map instead of running its own search.
+        - Distances are resolved lazily by 'path_from()', so the search only spreads as far as the furthest chasing enemy.
+        '''
+        if self._chase_pathfinder is None:
+            self.profiler.count("pathfinders")
+            graph = tcod.path.SimpleGraph(cost=self.game_map.get_path_cost(), cardinal=2, diagonal=3)
+            self._chase_pathfinder = tcod.path.Pathfinder(graph)
+            self._chase_pathfinder.add_root((self.player.x, self.player.y))
+
+        return self._chase_pathfinder
+
+
+    def get_noise_pathfinder(self, x: int, y: int) -> tcod.path.Pathfinder:
+        '''
+        Returns a pathfinder rooted at a noise's position, shared by every AI heading for it (the chase pathfinder if it's the player's tile).
+        '''
+        if (x, y) == (self.player.x, self.player.y):
+            return self.get_chase_pathfinder()
+
+        pathfinder = self._noise_pathfinders.get((x, y))
+        if pathfinder is None:
+            self.profiler.count("pathfinders")
+            graph = tcod.path.SimpleGraph(cost=self.game_map.get_path_cost(), cardinal=2, diagonal=3)
+            pathfinder = self._noise_pathfinders[x, y] = tcod.path.Pathfinder(graph)
+            pathfinder.add_root((x, y))
+
+        return pathfinder
 
 
     def update_fov(self) -> None:
@@ -62,14 +323,47 @@ class Engine:
         - "player.x, player.y" - the player's x/y point (character's POV)
         - "radius" - how far the FOV extends (in tiled spaces) 
         > (https://python-tcod.readthedocs.io/en/latest/tcod/map.html#tcod.map.compute_fov)
+
+        * Only the FOV "box" (the square around the player that the radius can reach) is computed and written, 
+          so the cost doesn't depend on the map size.
+        * Results are cached per (position, tiles_version) on the GameMap. If neither changed since the last call 
+          (waiting, attacking, bumping a wall) nothing is recomputed at all.
         '''
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
-            (self.player.x, self.player.y),
-            radius = 8
-        )
+        game_map = self.game_map
+        x, y = self.player.x, self.player.y
+        key = (x, y, game_map.tiles_version)
+
+        if key == game_map.fov_key:
+            return
+
+        radius = self.fov_radius
+        box = (slice(max(0, x - radius), x + radius + 1), slice(max(0, y - radius), y + radius + 1))
+
+        fov = game_map.fov_cache.get(key)
+        if fov is None:
+            fov = compute_fov(
+                game_map.tiles["transparent"][box],
+                (x - box[0].start, y - box[1].start),
+                radius = radius
+            )
+            game_map.fov_cache[key] = fov
+            if len(game_map.fov_cache) > game_map.FOV_CACHE_SIZE:
+                game_map.fov_cache.popitem(last=False)
+        else:
+            game_map.fov_cache.move_to_end(key)
+
+        # Clear the previous FOV box, then write the new one
+        if game_map.fov_box is not None:
+            game_map.visible[game_map.fov_box] = False
+        game_map.visible[box] = fov
+
         # If a tile is "visible", it must have been "explored" (so add the 'visible' array to the 'explored' array)
-        self.game_map.explored |= self.game_map.visible
+        game_map.explored[box] |= fov
+
+        game_map.fov_key = key
+        game_map.fov_box = box
+        self.dirty = True
+        self.profiler.count("fov_tiles", fov.size)
 
 
     def render(self, console: Console, context: Context) -> None:
@@ -77,7 +371,10 @@ class Engine:
         GameMap instance renders independently using its own .render() method. 
         Then 'tcod.context' displays the console to the screen. 
         '''
-        self.game_map.render(console)
+        profiler = self.profiler
+        # (Drawing is profiled per frame, apart from the turns: see 'profiler.py')
+        with profiler.phase("render", frame=True):
+            self.game_map.render(console)
 
         console.print(
             x       = 1,
@@ -85,6 +382,11 @@ class Engine:
             string  = f"HP: {self.player.fighter.hp} / {self.player.fighter.max_hp}"
         )
 
-        context.present(console)
+        if profiler.enabled:
+            profiler.draw(console)
+
+        with profiler.phase("present", frame=True):
+            context.present(console)
         console.clear()
+        profiler.end_frame()
     
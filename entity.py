@@ -11,10 +11,10 @@ Method:
 #_______________________________________________________________________// MODULES
 
 from __future__ import annotations
-import copy
 from typing import (Optional, Tuple, Type, TypeVar, TYPE_CHECKING)
 
 from render_order import RenderOrder
+from scheduler import NORMAL_SPEED
 
 if TYPE_CHECKING:
     from components.ai import BaseAI
@@ -35,6 +35,10 @@ T = TypeVar("T", bound="Entity")
 # The generic object that represents players, enemies, items, etc.
 class Entity:
 
+    # Fixed attribute layout (no per-instance '__dict__'): crowded maps hold thousands of these.
+    # 'gamemap' stays unset until the entity is put on a map, so 'hasattr(entity, "gamemap")' still works.
+    __slots__ = ("x", "y", "char", "color", "name", "blocks_movement", "render_order", "store_index", "gamemap")
+
     # Initialization
     def __init__(
         # Set initial values
@@ -55,24 +59,50 @@ class Entity:
         self.name           = name
         self.blocks_movement= blocks_movement
         self.render_order   = render_order
+        # Row in the GameMap's 'EntityStore' (-1 while the entity isn't on a map)
+        self.store_index    = -1
 
         if gamemap:
             # If a gamemap isn't provided now then it will be set later.
             self.gamemap = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+
+
+    def clone(self: T) -> T:
+        '''
+        Returns a new instance built from this one (used as a "prototype", ex: 'entity_factories.orc') without 'copy.deepcopy()'.
+        - Shared immutable data (char, color, name, base stats) is referenced, not copied.
+        - Only per-instance state is allocated: position, map registration, current hp, and a fresh AI.
+        '''
+        clone = type(self).__new__(type(self))
+        self._clone_into(clone)
+
+        return clone
+
+
+    def _clone_into(self, clone: Entity) -> None:
+        # Copies this entity's attributes onto a new, uninitialized instance (extended by subclasses with components)
+        clone.x                 = self.x
+        clone.y                 = self.y
+        clone.char              = self.char
+        clone.color             = self.color
+        clone.name              = self.name
+        clone.blocks_movement   = self.blocks_movement
+        clone.render_order      = self.render_order
+        clone.store_index       = -1
 
 
     def spawn(self: T, gamemap: GameMap, x: int, y:int) -> T:
         ''' 
-        Spawns a copy of this entity instance at a given location. 
+        Spawns a copy of this entity instance at a given location (see '.clone()'). 
         '''
-        clone = copy.deepcopy(self)
+        clone = self.clone()
 
         clone.x = x
         clone.y = y
 
         clone.gamemap = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
 
         return clone
 
@@ -81,29 +111,44 @@ class Entity:
         ''' 
         Place this entity at a new location (handles moving between GameMaps). 
         '''
-        self.x = x
-        self.y = y
-
         if gamemap:
-            # If this entity has a GameMap associated with it:
+            # If this entity has a GameMap associated with it, take it off that map (before its x/y changes):
             if hasattr(self, "gamemap"):
-                self.gamemap.entites.remove(self)
+                self.gamemap.remove_entity(self)
+            # Also covers entities handed to the new GameMap's constructor before being placed
+            gamemap.remove_entity(self)
+
+            self.x = x
+            self.y = y
 
             self.gamemap = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+
+        else:
+            old_x, old_y = self.x, self.y
+            self.x = x
+            self.y = y
+
+            if hasattr(self, "gamemap"):
+                self.gamemap.move_entity(self, old_x, old_y)
 
 
     def move(self, dx: int, dy: int) -> None:
-        # Move the entity by a given amount
+        # Move the entity by a given amount (and keep the map's spatial index in sync)
+        old_x, old_y = self.x, self.y
         self.x += dx
         self.y += dy
 
+        self.gamemap.move_entity(self, old_x, old_y)
+
 
 
 class Actor(Entity):
     '''
     Inherits all the properties/attributes/methods of the 'Entity' class.
     '''
+
+    __slots__ = ("ai", "fighter", "speed")
     
     def __init__(
         self,
@@ -114,7 +159,8 @@ class Actor(Entity):
         color: Tuple[int, int, int] = (255, 255, 255),
         name: str = "<Unnamed>",
         ai_cls: Type[BaseAI],
-        fighter: Fighter
+        fighter: Fighter,
+        speed: int = NORMAL_SPEED
     ):
         # Calls the super class '__init__()' function (ie, the parent class / 'Entity' class __init__)
         super().__init__(
@@ -133,6 +179,17 @@ class Actor(Entity):
         self.fighter = fighter
         self.fighter.entity = self
 
+        # How fast this actor's actions go by (twice 'NORMAL_SPEED' takes half the time: it gets two turns for the player's one)
+        self.speed = speed
+
+
+    def _clone_into(self, clone: Entity) -> None:
+        # Components hold per-instance state, so the clone gets its own Fighter and AI (bound to the clone)
+        super()._clone_into(clone)
+        clone.fighter   = self.fighter.clone(clone)        # type: ignore
+        clone.ai        = type(self.ai)(clone) if self.ai else None     # type: ignore
+        clone.speed     = self.speed                                    # type: ignore
+
 
     @property
     def is_alive(self) -> bool:
@@ -8,6 +8,7 @@ Includes player, NPCs (shopkeepers, etc.) enemies, and more!
 
 from entity import Actor
 from components.ai import HostileEnemy
+from scheduler import NORMAL_SPEED
 from components.fighter import Fighter
 
 from colors import *
@@ -36,10 +37,12 @@ orc = Actor(
     fighter     = Fighter(hp=10, defense=0, power=3)
 )
 
+# (Trolls are slow: 3 turns for every 4 of the player's, see 'scheduler.py')
 troll = Actor(
     char       = "T",
     color      = red,
     name       = "Troll",
     ai_cls     = HostileEnemy,
-    fighter     = Fighter(hp=16, defense=1, power=4)
+    fighter     = Fighter(hp=16, defense=1, power=4),
+    speed      = NORMAL_SPEED * 3 // 4
 )
@@ -0,0 +1,151 @@
+'''
+Struct-of-arrays ("ECS-style") storage for the entities on a GameMap.
+
+Every entity registered with a map gets a row in its 'EntityStore'. Each attribute lives in its own contiguous numpy column
+(x, y, hp, max_hp, defense, power, speed, render order, glyph, color, alive/blocking/pursuing flags), so bulk questions like
+"who is adjacent to the player" or "who is in FOV" become one vectorized expression instead of a Python loop.
+
+- The 'Entity' / 'Actor' objects stay the handles the rest of the game works with. Each one knows its row ('store_index').
+- Rows are written when an entity is added to a map and freed when it's removed (see 'GameMap.add_entity()' / 'remove_entity()').
+- Positions are updated by 'GameMap.move_entity()' and hp by the 'Fighter.hp' setter, so the columns never go stale.
+- Freed rows are recycled, and the columns double in size when they run out of room.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+from typing import (List, Optional, TYPE_CHECKING)
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+
+
+#_______________________________________________________________________// CLASS
+
+class EntityStore:
+
+    def __init__(self, capacity: int = 64):
+        # Handle (Entity instance) for each row, 'None' for a free row
+        self.entities: List[Optional[Entity]] = [None] * capacity
+        # Rows given back by 'remove()', reused before the columns grow
+        self.free_rows: List[int] = []
+        # Rows below this index have been handed out at least once
+        self.size = 0
+
+        self.in_use         = np.zeros(capacity, dtype=bool)        # Row holds a registered entity
+        self.alive          = np.zeros(capacity, dtype=bool)        # Actor with an 'ai' (see 'Actor.is_alive')
+        self.blocks         = np.zeros(capacity, dtype=bool)        # 'blocks_movement'
+        self.pursuing       = np.zeros(capacity, dtype=bool)        # AI still acts while unseen (see 'BaseAI.pursuing')
+        self.x              = np.zeros(capacity, dtype=np.intc)
+        self.y              = np.zeros(capacity, dtype=np.intc)
+        self.hp             = np.zeros(capacity, dtype=np.intc)     # Fighter stats (0 for entities without a fighter)
+        self.max_hp         = np.zeros(capacity, dtype=np.intc)
+        self.defense        = np.zeros(capacity, dtype=np.intc)
+        self.power          = np.zeros(capacity, dtype=np.intc)
+        self.speed          = np.zeros(capacity, dtype=np.intc)     # 'Actor.speed' (0 for other entities)
+        self.render_order   = np.zeros(capacity, dtype=np.int8)     # 'RenderOrder' value
+        self.ch             = np.zeros(capacity, dtype=np.intc)     # Unicode codepoint of the entity's 'char'
+        self.fg             = np.zeros((capacity, 3), dtype=np.uint8)
+
+
+    @property
+    def capacity(self) -> int:
+        return len(self.entities)
+
+
+    def _grow(self) -> None:
+        '''
+        Doubles the length of every column (existing rows are copied over).
+        '''
+        capacity = self.capacity * 2
+        for name in ("in_use", "alive", "blocks", "pursuing", "x", "y", "hp", "max_hp", "defense", "power", "speed", "render_order", "ch", "fg"):
+            old = getattr(self, name)
+            new = np.zeros((capacity, *old.shape[1:]), dtype=old.dtype)
+            new[: len(old)] = old
+            setattr(self, name, new)
+
+        self.entities.extend([None] * (capacity - len(self.entities)))
+
+
+    def add(self, entity: Entity) -> int:
+        '''
+        Gives the entity a row, copies its attributes into the columns, and returns the row index.
+        '''
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+
+        self.entities[row] = entity
+        self.in_use[row] = True
+        self.sync(row, entity)
+
+        return row
+
+
+    def remove(self, row: int) -> None:
+        '''
+        Frees a row so it can be reused.
+        '''
+        self.entities[row] = None
+        self.in_use[row] = False
+        self.alive[row] = False
+        self.blocks[row] = False
+        self.pursuing[row] = False
+        self.free_rows.append(row)
+
+
+    def sync(self, row: int, entity: Entity) -> None:
+        '''
+        Copies every mirrored attribute of the entity into its row.
+        '''
+        self.x[row]             = entity.x
+        self.y[row]             = entity.y
+        self.blocks[row]        = entity.blocks_movement
+        self.render_order[row]  = entity.render_order.value
+        self.ch[row]            = ord(entity.char)
+        self.fg[row]            = entity.color
+
+        # Only actors carry 'ai' and 'fighter' components
+        ai = getattr(entity, "ai", None)
+        self.alive[row] = bool(ai)
+        self.pursuing[row] = bool(ai) and ai.pursuing
+        self.speed[row] = getattr(entity, "speed", 0)
+
+        fighter = getattr(entity, "fighter", None)
+        if fighter:
+            self.hp[row]        = fighter.hp
+            self.max_hp[row]    = fighter.max_hp
+            self.defense[row]   = fighter.defense
+            self.power[row]     = fighter.power
+        else:
+            self.hp[row] = self.max_hp[row] = self.defense[row] = self.power[row] = 0
+
+
+    def living_rows(self) -> np.ndarray:
+        '''
+        Returns the row indices of every living actor.
+        '''
+        return np.flatnonzero(self.alive[: self.size])
+
+
+    def rows_in(self, mask: np.ndarray) -> np.ndarray:
+        '''
+        Returns the row indices of every entity standing on a 'True' tile of a map-sized boolean array (ex: 'GameMap.visible').
+        '''
+        rows = np.flatnonzero(self.in_use[: self.size])
+        return rows[mask[self.x[rows], self.y[rows]]]
+
+
+    def distance_from(self, x: int, y: int, rows: np.ndarray) -> np.ndarray:
+        '''
+        Returns the Chebyshev distance (king moves) from (x, y) to each of the given rows.
+        '''
+        return np.maximum(np.abs(self.x[rows] - x), np.abs(self.y[rows] - y))
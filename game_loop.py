@@ -0,0 +1,99 @@
+'''
+The main loop: renders only when something changed, caps the frame rate, and spends idle time on background tasks.
+
+Each pass of 'GameLoop.tick()':
+    1. If the engine is 'dirty' (an action was taken, the FOV changed, something died, the window was exposed/resized)
+       and the next frame is due, the frame is rendered and presented. Otherwise nothing is drawn at all.
+    2. Background tasks (ex: topping up the level pregenerator's queue) are run one after another until the frame's time is up.
+    3. The loop waits for input until the frame's time is up, returning as soon as an event arrives,
+       so a key press is handled right away but an idle game doesn't spin the CPU.
+
+The simulation itself still only advances when the player acts ('Engine.handle_player_action()'), so frames and turns are decoupled:
+holding a key down can queue several turns in one frame, and an idle game draws nothing.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import time
+from typing import (Callable, List, TYPE_CHECKING)
+
+import tcod.event
+
+if TYPE_CHECKING:
+    from tcod.console import Console
+    from tcod.context import Context
+    from engine import Engine
+
+
+
+#_______________________________________________________________________// CLASS
+
+class GameLoop:
+    '''
+    Runs an engine in a window: 'max_fps' caps how often a changed frame gets presented.
+    - Callables added to 'background_tasks' are run in the idle part of each frame (each one should return quickly).
+    '''
+
+    def __init__(self, engine: Engine, console: Console, context: Context, max_fps: int = 60):
+        self.engine = engine
+        self.console = console
+        self.context = context
+        self.frame_time = 1 / max_fps
+        # When the next frame may be presented (the frame rate cap)
+        self.next_frame = 0.0
+        self.background_tasks: List[Callable[[], None]] = []
+        # Round-robin position in 'background_tasks', so every task gets a turn even when frames are busy
+        self._next_task = 0
+
+
+    def run(self) -> None:
+        '''
+        Runs the game until an action raises 'SystemExit' (ex: the 'ESC' key, or closing the window).
+        '''
+        while True:
+            self.tick()
+
+
+    def tick(self) -> None:
+        '''
+        One pass of the loop: present the frame if it changed and is due, run background tasks, then wait for input.
+        '''
+        now = time.perf_counter()
+        if self.engine.dirty and now >= self.next_frame:
+            self.engine.render(console=self.console, context=self.context)
+            self.engine.dirty = False
+            self.next_frame = now + self.frame_time
+
+        # With a frame waiting to be presented, only wait until it's due. Otherwise idle for up to one frame.
+        deadline = self.next_frame if self.engine.dirty else now + self.frame_time
+
+        self.run_background_tasks(deadline)
+
+        for event in tcod.event.wait(timeout=max(0.0, deadline - time.perf_counter())):
+            self.handle_event(event)
+
+
+    def handle_event(self, event: tcod.event.Event) -> None:
+        '''
+        Passes an event to the engine's current event handler (looked up per event, since handling one can swap the handler).
+        '''
+        if isinstance(event, tcod.event.WindowEvent):
+            # Exposed, resized, restored...: the window needs to be drawn again
+            self.engine.dirty = True
+
+        self.engine.event_handler.handle_event(event)
+
+
+    def run_background_tasks(self, deadline: float) -> None:
+        '''
+        Runs background tasks (round-robin) until each had one turn or the deadline passed.
+        '''
+        for _ in range(len(self.background_tasks)):
+            if time.perf_counter() >= deadline:
+                return
+
+            task = self.background_tasks[self._next_task % len(self.background_tasks)]
+            self._next_task += 1
+            task()
@@ -9,12 +9,16 @@ The default-filled wall tiles are "dug out" by the 'procgen.py' module's dungeon
 #_______________________________________________________________________// MODULES
 
 from __future__ import annotations
-from typing import (Iterable, Iterator, Optional, TYPE_CHECKING)
+from collections import OrderedDict
+from typing import (Dict, Iterable, Iterator, List, Optional, Tuple, TYPE_CHECKING)
 
 import numpy as np
 from tcod.console import Console
 
+from dormancy import DormantIndex
 from entity import Actor
+from entity_store import EntityStore
+from scheduler import TurnScheduler
 import tile_types
 
 if TYPE_CHECKING:
@@ -31,21 +35,42 @@ class GameMap:
     Includes properties for 'visible' and 'explored' areas which are referenced in the .render() method to determine the tile states.  
     '''
 
-    def __init__(self, engine: Engine, width: int, height: int, entities: Iterable[Entity] = ()):
+    # Most FOV results (one per player position) kept in 'fov_cache' before the least recently used one is dropped
+    FOV_CACHE_SIZE = 256
+
+    def __init__(
+        self, 
+        engine: Engine, 
+        width: int, 
+        height: int, 
+        entities: Iterable[Entity] = (), 
+        tiles: Optional[np.ndarray] = None
+    ):
         '''
         Takes an Engine instance, values for width/height, and an entities instance. 
         Defines arrays for this map's tile types - 'visible' and/or 'explored'.
+        An already generated 'tiles' array (width x height) can be passed in instead of starting from solid wall.
         '''
         self.engine = engine
         self.width, self.height = width, height
         # Creates a a Set of Entity class instances (passed in as an iterable object)
-        self.entities = set(entities)
+        self.entities = set()
+        # Spatial index: maps an (x, y) position to the entities standing on it (kept current by 'add/remove/move_entity()')
+        self.entity_locations: Dict[Tuple[int, int], List[Entity]] = {}
+        # Column (numpy array) copies of every entity's position, stats, glyph and flags, for vectorized queries
+        self.store = EntityStore()
+        # This map's clock and the awake actors' next turns
+        self.scheduler = TurnScheduler()
+        # Splits the living actors into awake (scheduled) and dormant (costing nothing until woken) rows
+        self.dormant = DormantIndex(self.store, self.scheduler)
         # Fill area of given dimensions with default wall tiles. 
-        self.tiles = np.full(
-            (width, height), 
-            fill_value=tile_types.wall, 
-            order="F"
-        )
+        if tiles is None:
+            tiles = np.full(
+                (width, height), 
+                fill_value=tile_types.wall, 
+                order="F"
+            )
+        self.tiles = tiles
         # Area of map with a 'visible' tiles ('Light' color mode and in player FOV)
         self.visible = np.full(
             (width, height), 
@@ -59,29 +84,96 @@ class GameMap:
             order="F"
         )
 
+        # Bumped by 'mark_tiles_changed()' whenever tiles are edited after generation (invalidates cached FOV)
+        self.tiles_version = 0
+        # FOV results keyed by (player x, player y, tiles_version) -> the visible area inside that position's FOV box
+        self.fov_cache: OrderedDict[Tuple[int, int, int], np.ndarray] = OrderedDict()
+        # The key and box (pair of slices) of the FOV currently written into 'visible'
+        self.fov_key: Optional[Tuple[int, int, int]] = None
+        self.fov_box: Optional[Tuple[slice, slice]] = None
+
+        for entity in entities:
+            self.add_entity(entity)
+
+
+    def mark_tiles_changed(self) -> None:
+        '''
+        Call after editing 'tiles' once the map is in play (digging, doors, etc.) so cached FOV results get recomputed.
+        '''
+        self.tiles_version += 1
+        self.fov_cache.clear()
+
+
+    def add_entity(self, entity: Entity) -> None:
+        '''
+        Registers an entity with this map and indexes it under its current x/y position.
+        Living actors start out dormant (the engine wakes them once the player gets near, sees them, or makes noise).
+        The player isn't scheduled: its turns are the player's actions.
+        '''
+        self.entities.add(entity)
+        self.entity_locations.setdefault((entity.x, entity.y), []).append(entity)
+        entity.store_index = self.store.add(entity)
+        if self.store.alive[entity.store_index] and entity is not self.engine.player:
+            self.dormant.add(entity.store_index)
+
+
+    def remove_entity(self, entity: Entity) -> None:
+        '''
+        Removes an entity from this map and from the spatial index (call BEFORE changing the entity's x/y).
+        '''
+        if entity not in self.entities:
+            return
+        self.entities.discard(entity)
+        self._unindex(entity, entity.x, entity.y)
+        self.dormant.discard(entity.store_index)
+        self.store.remove(entity.store_index)
+        entity.store_index = -1
+
+
+    def move_entity(self, entity: Entity, old_x: int, old_y: int) -> None:
+        '''
+        Re-indexes an entity that moved from (old_x, old_y) to its current x/y position.
+        '''
+        self._unindex(entity, old_x, old_y)
+        self.entity_locations.setdefault((entity.x, entity.y), []).append(entity)
+        self.store.x[entity.store_index] = entity.x
+        self.store.y[entity.store_index] = entity.y
+        self.dormant.moved(entity.store_index)
+
+
+    def _unindex(self, entity: Entity, x: int, y: int) -> None:
+        # Drop the entity from the occupant list at (x, y), and drop the list itself once that tile is empty.
+        occupants = self.entity_locations.get((x, y))
+        if not occupants or entity not in occupants:
+            return
+        occupants.remove(entity)
+        if not occupants:
+            del self.entity_locations[x, y]
+
+
+    def get_entities_at_location(self, x: int, y: int) -> List[Entity]:
+        '''
+        Returns the entities standing on the given tile (an empty list if there are none). 
+        '''
+        return self.entity_locations.get((x, y), [])
+
 
     @property
     def actors(self) -> Iterator[Actor]:
         '''
         Iterates over this maps living/alive actors and returns ('yields') any that are still alive. 
+        (The store's 'alive' column already marks living actors, so no entity has to be type-checked.)
         '''
-        yield from(
-            entity 
-            for entity in self.entities
-            if isinstance(entity, Actor) and entity.is_alive
-        )
+        entities = self.store.entities
+        yield from (entities[row] for row in self.store.living_rows().tolist())
 
 
     def get_blocking_entity_at_location(self, location_x:int, location_y:int) -> Optional[Entity]:
         '''
-        Iterates through map's entities set, finds one occupying the given location (and has "blocks_movement = True"), and returns it.
+        Looks up the entities occupying the given location (spatial index) and returns the one with "blocks_movement = True".
         '''
-        for entity in self.entities:
-            if (
-                entity.blocks_movement 
-                and entity.x == location_x 
-                and entity.y == location_y
-            ):
+        for entity in self.entity_locations.get((location_x, location_y), ()):
+            if entity.blocks_movement:
                 # If an entity meets the criteria, return it
                 return entity
         # If not, return an empty object.
@@ -92,13 +184,33 @@ class GameMap:
         '''
         Return an Actor instance if the given location matches the actor's set coordinates (ie, actor is at given location)
         '''
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
+        for entity in self.entity_locations.get((x, y), ()):
+            if isinstance(entity, Actor) and entity.is_alive:
+                return entity
         # Otherwise return an empty object
         return None
 
 
+    def get_path_cost(self) -> np.ndarray:
+        '''
+        Returns a pathfinding cost array for this map: walkable tiles cost 1, walls cost 0 (impassable).
+        - Tiles occupied by a blocking entity get +10, so paths prefer to go around other actors rather than through them.
+        - Blocked tiles are read from the store's 'blocks' / 'x' / 'y' columns (no Python loop over the level's entities).
+        '''
+        cost = np.array(self.tiles["walkable"], dtype=np.int8)
+
+        store = self.store
+        blocking = np.flatnonzero(store.blocks[: store.size])
+        if len(blocking):
+            # (A tile with several blockers is only counted once: fancy-indexed '+=' writes each tile once)
+            index = store.x[blocking], store.y[blocking]
+            # A lower number means more enemies will crowd behind each other in hallways.
+            # A higher number means enemies will take longer paths in order to surround the player.
+            cost[index] += 10 * (cost[index] > 0)
+
+        return cost
+
+
     def in_bounds(self, x: int, y: int) -> bool:
         ''' 
         Check if something is inside the map's dimensions/area using given x/y and returns True or False.
@@ -106,38 +218,67 @@ class GameMap:
         return 0 <= x < self.width and 0 <= y < self.height
 
 
+    def follow(self, entity: Entity) -> None:
+        '''
+        Called by the engine after the player acts. A GameMap holds its whole level in memory, so there's nothing to do.
+        (Maps that only keep the area around the player loaded, like 'ChunkedGameMap', load/unload chunks here.)
+        '''
+
+
+    def close(self) -> None:
+        '''
+        Called once the map is done with. A GameMap only holds memory, so there's nothing to release.
+        (Maps that keep files of their own, like 'ChunkedGameMap', delete them here.)
+        '''
+
+
+    def viewport(self) -> Tuple[slice, slice]:
+        '''
+        Returns the area of the map drawn by '.render()' (its top-left tile is drawn in the console's top-left cell).
+        A GameMap is drawn whole.
+        '''
+        return slice(0, self.width), slice(0, self.height)
+
+
     def render(self, console: Console) -> None:
         ''' 
         Sets tiles and entities to the map. 
             - If the tile is in the "visible" array, draw it with the 'light' color.
             - If it isn't, but it's been 'explored', draw it with the 'dark' color.
             - If tile is unexplored, default to "SHROUD".
-        Tiles are sorted into Lists:
-            - 'condlist': Tiles can be both visible AND explored, so they make up a parent list of conditional states.
-            - 'choicelist': Tiles in either of the two color states (sorted depending on FOV calculations).
-            - 'default': Any tiles not in the above lists are effectively unexplored. They will render as 'SHROUD' 
-        '''
-        console.tiles_rgb[0: self.width, 0: self.height] = np.select(
-            # Lists to determine tile appearance
-            condlist    = [self.visible, self.explored],                
-            choicelist  = [self.tiles["light"], self.tiles["dark"]],    
-            default     = tile_types.SHROUD                             
-        )
-
-        # Determine in what order to render entities:
-        entities_sorted_for_rendering = sorted(
-            self.entities,                              # The Set of entities to sort
-            key = lambda x: x.render_order.value        # A custom key for sorting by (using 'render_order' module)
-        )
+        Tiles are written straight into the console's own buffer ('console.tiles_rgb'), one field at a time:
+            - The map area is filled with 'SHROUD', then 'dark' graphics are copied where 'explored', then 'light' graphics where 'visible'.
+            - 'np.copyto(..., where=...)' only copies the masked cells, so no full-map temporary arrays are built per frame.
+        Entities are drawn from the map's 'EntityStore' columns (positions, glyphs, colors, render order):
+            - Rows are masked against 'visible', split by render order, and each layer is scattered into the console in one batched write.
+        Only the '.viewport()' area is drawn (the whole map, unless a subclass moves a camera over a bigger map).
+        '''
+        view = self.viewport()
+        left, top = view[0].start, view[1].start
+        view_width, view_height = view[0].stop - left, view[1].stop - top
 
-        # Iterate through entities and add one to the console if it exists in a 'visible' area of the map.
-        for entities in entities_sorted_for_rendering:
-            if self.visible[entity.x, entity.y]:
-                console.print(
-                    x = entity.x, y = entity.y, string = entity.char,  fg = entity.color
-                )
-    
+        # View (not a copy) of the console cells covering the drawn area
+        output = console.tiles_rgb[0: view_width, 0: view_height]
+        output[...] = tile_types.SHROUD
+        self.engine.profiler.count("tiles_rendered", output.size, frame=True)
 
+        for layer, mask in (("dark", self.explored[view]), ("light", self.visible[view])):
+            graphics = self.tiles[layer][view]
+            np.copyto(output["ch"], graphics["ch"], where=mask)
+            np.copyto(output["fg"], graphics["fg"], where=mask[..., np.newaxis])
+            np.copyto(output["bg"], graphics["bg"], where=mask[..., np.newaxis])
 
+        # Entities standing in a 'visible' area of the map (and inside the drawn area), read straight from the store's columns
+        store = self.store
+        rows = store.rows_in(self.visible)
+        x, y = store.x[rows] - left, store.y[rows] - top
+        inside = (x >= 0) & (x < view_width) & (y >= 0) & (y < view_height)
+        rows, x, y = rows[inside], x[inside], y[inside]
 
-    
\ No newline at end of file
+        # Draw one render layer at a time (lowest render order first), so higher layers overwrite lower ones.
+        orders = store.render_order[rows]
+        for order in np.unique(orders):
+            layer = orders == order
+            # Scatter the layer's glyphs and colors into the console in one write per field
+            output["ch"][x[layer], y[layer]] = store.ch[rows[layer]]
+            output["fg"][x[layer], y[layer]] = store.fg[rows[layer]]
@@ -0,0 +1,235 @@
+'''
+Headless simulation: runs an Engine and a generated map with no window, console, or event loop.
+
+Instead of waiting on 'tcod.event.wait()', the game is stepped programmatically with scripted player actions.
+This is meant for CI and load testing on machines without a display (thousands of turns per second).
+
+Usage:
+    game = HeadlessGame(seed=1)
+    game.step(BumpAction(game.player, 1, 0))        # One player action + the enemy phase + FOV update
+    game.run(random_walk, turns=10_000)             # Drive it with a policy (a function returning the next action)
+    game.close()                                    # Deletes what the map keeps on disk (an overworld's chunks)
+
+From the command line (prints turns per second):
+    >> python headless.py --turns 10000 --seed 1
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import random
+import time
+from typing import (Callable, Optional)
+
+from actions import (Action, BumpAction, WaitAction)
+from chunked_map import generate_overworld
+from journal import JournalWriter
+from engine import Engine
+from entity import Actor
+import entity_factories
+from level_cache import LevelCache
+from level_manager import LevelManager
+from pregen import LevelPregenerator
+from procgen import (build_dungeon, generate_cave, generate_dungeon_layout)
+
+
+
+#_______________________________________________________________________// DECLARATION
+
+# A policy looks at the engine and returns the player's next action ('None' ends the run)
+Policy = Callable[[Engine], Optional[Action]]
+
+
+
+#_______________________________________________________________________// CLASS
+
+class HeadlessGame:
+    '''
+    Builds a player, an Engine and a random dungeon (same defaults as 'main.main()'), then steps them without rendering.
+    - 'seed' makes the dungeon reproducible (generation draws from its own 'random.Random(seed)', never the global 'random' module,
+      so many games can share a process, ex: server sessions).
+    - 'level_cache' reuses the layout generated by an earlier run with the same seed and settings (requires a seed).
+    - 'quiet' swallows the combat messages normally printed to the terminal.
+    - 'overworld' plays on an endless chunked overworld ('chunked_map.py') instead of a single dungeon level.
+    - 'cave' plays on a cellular-automata cave ('procgen.generate_cave_layout()') instead of rooms and tunnels.
+    A dungeon run can change levels ('engine.descend()' / 'ascend()'): levels below are generated in this process when they're
+    entered (seeded like 'main.main()' does), and the levels left behind are kept by a 'LevelManager'.
+    '''
+
+    def __init__(
+        self,
+        *,
+        map_width:      int = 80,
+        map_height:     int = 45,
+        room_min_size:  int = 6,
+        room_max_size:  int = 10,
+        max_rooms:      int = 30,
+        max_enemies:    int = 2,
+        seed:           Optional[int] = None,
+        level_cache:    Optional[LevelCache] = None,
+        quiet:          bool = True,
+        overworld:      bool = False,
+        cave:           bool = False,
+    ):
+        self.seed = seed
+
+        self.quiet = quiet
+        # Number of player actions stepped so far
+        self.turn = 0
+
+        player = entity_factories.player.clone()
+        self.engine = Engine(player=player)
+        self.params = params = dict(
+            max_rooms       = max_rooms,
+            room_min_size   = room_min_size,
+            room_max_size   = room_max_size,
+            map_width       = map_width,
+            map_height      = map_height,
+            max_enemies     = max_enemies,
+        )
+        if overworld:
+            self.engine.game_map = generate_overworld(self.engine, seed=seed or 0)
+            self.engine.update_fov()
+            return
+
+        if cave:
+            self.engine.game_map = generate_cave(map_width, map_height, self.engine, random.Random(seed))
+            self.engine.update_fov()
+            return
+
+        if level_cache is not None and seed is not None:
+            layout = level_cache.get_or_generate(seed, params)
+        else:
+            layout = generate_dungeon_layout(rng=random.Random(seed), **params)
+
+        self.engine.game_map = build_dungeon(layout, self.engine)
+        self.engine.pregenerator = LevelPregenerator(
+            params, seed=random.Random(seed).getrandbits(32), cache=level_cache, max_workers=0
+        )
+        self.engine.levels = LevelManager(self.engine)
+        self.engine.update_fov()
+
+
+    @property
+    def player(self) -> Actor:
+        return self.engine.player
+
+
+    @property
+    def game_over(self) -> bool:
+        return not self.engine.player.is_alive
+
+
+    def step(self, action: Action) -> bool:
+        '''
+        Runs one full turn for the given player action. Returns 'False' once the player is dead (the game is over).
+        '''
+        if self.game_over:
+            return False
+
+        if self.quiet:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.engine.handle_player_action(action)
+        else:
+            self.engine.handle_player_action(action)
+
+        self.turn += 1
+        return not self.game_over
+
+
+    def close(self) -> None:
+        '''
+        Releases what the game holds outside memory (ex: the temporary directory of an overworld, or of evicted levels).
+        '''
+        self.engine.game_map.close()
+        if self.engine.levels is not None:
+            self.engine.levels.clear()
+
+
+    def run(self, policy: Policy, turns: int) -> int:
+        '''
+        Steps the game with actions from 'policy' until 'turns' actions were taken, the policy returns 'None', or the player dies.
+        Returns the number of turns actually taken.
+        '''
+        start = self.turn
+        while self.turn - start < turns:
+            action = policy(self.engine)
+            if action is None or not self.step(action):
+                break
+
+        return self.turn - start
+
+
+
+#_______________________________________________________________________// FUNCTIONS
+
+def random_walk(engine: Engine) -> Action:
+    '''
+    Policy: bump in a random direction (moves or attacks), or wait (draws from the global 'random' module).
+    '''
+    dx, dy = random.randint(-1, 1), random.randint(-1, 1)
+    if dx == dy == 0:
+        return WaitAction(engine.player)
+
+    return BumpAction(engine.player, dx, dy)
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the game headlessly with a random-walk player.")
+    parser.add_argument("--turns", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=45)
+    parser.add_argument("--max-enemies", type=int, default=2)
+    parser.add_argument("--cache", metavar="DIR", default=None, help="reuse generated layouts from this cache directory")
+    parser.add_argument("--overworld", action="store_true", help="play on the endless chunked overworld")
+    parser.add_argument("--cave", action="store_true", help="play on a cellular-automata cave")
+    parser.add_argument("--profile", metavar="PATH", default=None, help="profile every turn and write the report (JSON) here")
+    parser.add_argument("--record", metavar="PATH", default=None, help="record the run in an action journal (see 'journal.py')")
+    args = parser.parse_args()
+
+    if args.record and (args.overworld or args.cave):
+        parser.error("--record only supports dungeon runs")
+    if args.record and args.seed is None:
+        # A journal needs the seed to replay the run
+        args.seed = random.getrandbits(32)
+
+    # The random-walk policy draws from the global 'random' module: seed it too, so the whole run is reproducible
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    game = HeadlessGame(
+        map_width   = args.width, 
+        map_height  = args.height, 
+        max_enemies = args.max_enemies, 
+        seed        = args.seed,
+        level_cache = LevelCache(args.cache) if args.cache else None,
+        overworld   = args.overworld,
+        cave        = args.cave,
+    )
+
+    game.engine.profiler.enabled = bool(args.profile)
+    if args.record:
+        game.engine.journal = JournalWriter.create(args.record, args.seed, game.params)
+
+    start = time.perf_counter()
+    turns = game.run(random_walk, args.turns)
+    elapsed = time.perf_counter() - start
+
+    if args.profile:
+        game.engine.profiler.export(args.profile)
+    if args.record:
+        game.engine.journal.close()     # type: ignore
+    game.close()
+
+    print(f"{turns} turns in {elapsed:.3f}s ({turns / max(elapsed, 1e-9):.0f} turns/s), player hp: {game.player.fighter.hp}")
+
+
+
+if __name__ == '__main__':
+    main()
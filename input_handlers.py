@@ -67,6 +67,11 @@ WAIT_KEYS = {
     tcod.event.K_CLEAR,
 }
 
+# Profiling (see 'profiler.py'): toggle the timers and their overlay / write the numbers to a file
+PROFILER_TOGGLE_KEY = tcod.event.K_F3
+PROFILER_EXPORT_KEY = tcod.event.K_F4
+PROFILER_EXPORT_PATH = "profile.json"
+
 
 
 #_______________________________________________________________________// CLASSES
@@ -81,7 +86,10 @@ class EventHandler(tcod.event.EventDispatch[Action]):
         self.engine = engine
 
 
-    def handle_events(self) -> None:
+    def handle_event(self, event: tcod.event.Event) -> None:
+        '''
+        Handles one event (the main loop in 'game_loop.py' passes them in as they arrive, without blocking).
+        '''
         raise NotImplementedError()
 
 
@@ -96,20 +104,23 @@ class MainGameEventHandler(EventHandler):
     - Use this class for the main game.
     - KeyDown events call 'EscapeAction' or 'BumpAction' (which determines to perform either 'MoveAction' or 'MeleeAction').
     - 'ev_quit()' is already attached since its defined in the 'EventHandler' base class.
+    - The player's bump/wait actions are built once and re-aimed on every key press (they're performed right away).
     '''
-    
-    def handle_events(self) -> None:
-        for event in tcod.event.wait():
-            action = self.dispatch(event)
 
-            if action is None:
-                continue
-                
-            action.perform()
+    def __init__(self, engine: Engine):
+        super().__init__(engine)
+        self._bump: Optional[BumpAction] = None
+        self._wait: Optional[WaitAction] = None
 
-            # Enemies take turns and player FOV is updated before the next action.
-            self.engine.handle_enemy_turns()
-            self.engine.update_fov()
+    
+    def handle_event(self, event: tcod.event.Event) -> None:
+        action = self.dispatch(event)
+
+        if action is None:
+            return
+            
+        # Enemies take turns and player FOV is updated before the next action.
+        self.engine.handle_player_action(action)
 
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
@@ -123,15 +134,28 @@ class MainGameEventHandler(EventHandler):
         # Check if keypress matches a valid keypress in the pre-defined Dict objects
         if key in MOVE_KEYS:
            dx, dy = MOVE_KEYS[key]
-           action = BumpAction(player, dx, dy)
+           # (Rebuilt if the engine's player was swapped, ex: after loading a save)
+           if self._bump is None or self._bump.entity is not player:
+               self._bump = BumpAction(player, dx, dy)
+           action = self._bump.aim(dx, dy)
 
         elif key in WAIT_KEYS:
-            action = WaitAction(player)
+            if self._wait is None or self._wait.entity is not player:
+                self._wait = WaitAction(player)
+            action = self._wait
 
         # The 'ESC' key returns an 'escape' action
         elif key == tcod.event.K_ESCAPE:
             action = EscapeAction(player)
 
+        # Profiling keys don't take a turn (no action), they only change what's drawn
+        elif key == PROFILER_TOGGLE_KEY:
+            self.engine.profiler.toggle()
+            self.engine.dirty = True
+
+        elif key == PROFILER_EXPORT_KEY:
+            self.engine.profiler.export(PROFILER_EXPORT_PATH)
+
         # Returns the resulting action type (defualt = 'none')
         return action
 
@@ -141,17 +165,16 @@ class GameOverEventHandler(EventHandler):
     '''
     Inherits and extends 'EventHandler' class for limited controls available to the player.
     - Use this class after the player dies where the only valid key should be 'ESC'.
-    - Handling is identical to 'MainGameEventHandler.handle_events()' method, but without enemy turns or updating FOV.
+    - Handling is identical to 'MainGameEventHandler.handle_event()' method, but without enemy turns or updating FOV.
     '''
 
-    def handle_events(self) -> None:
-        for event in tcod.event.wait():
-            action = self.dispatch(event)
+    def handle_event(self, event: tcod.event.Event) -> None:
+        action = self.dispatch(event)
 
-            if action is None:
-                continue
+        if action is None:
+            return
 
-            action.perform()
+        action.perform()
 
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
@@ -160,7 +183,7 @@ class GameOverEventHandler(EventHandler):
         '''
         action: Optional[Action] = None
 
-        key = event.SystemExit
+        key = event.sym
 
         if key == tcod.event.K_ESCAPE:
             action = EscapeAction(self.engine.player)
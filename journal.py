@@ -0,0 +1,346 @@
+'''
+Action journal: every player action of a run recorded in a compact, append-only binary file, and a headless replay of it.
+
+A run is fully determined by its seed, its level settings and the player's actions (generation draws from a seeded rng,
+and combat/AI have no randomness), so the journal is all that's needed to reproduce a crash or a slowdown.
+
+File layout (little-endian):
+
+    header      "RGJ1", version, seed, level settings (see 'LEVEL_PARAMS'), hash interval
+    records     one per player action, 3 bytes each:    kind (BUMP / WAIT), dx, dy
+                every 'hash_interval' actions, also:    HASH, 8 byte blake2b digest of the game state after that action
+
+The state hash covers the map's tiles and the position and hp of every entity (read from the map's 'EntityStore',
+sorted so the rows entities happen to sit in don't matter), so a replay that drifts from the recorded run is caught
+within 'hash_interval' turns of where it happened.
+
+A run resumed from a save keeps recording the same journal only if the journal holds exactly the actions that led to that save
+(see 'journal_for_save()'). Otherwise a new journal is started from the save itself: a copy of the save is kept next to it
+('<journal>.start/'), and replaying that journal loads the copy instead of generating the first level from the seed.
+
+Usage:
+    >> python journal.py journal.rgj                 (replay at full speed, verify hashes, print turns per second)
+    >> python journal.py journal.rgj --no-verify     (benchmark only)
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import struct
+import sys
+import time
+from typing import (Any, BinaryIO, Dict, Iterator, NamedTuple, Optional, Tuple, TYPE_CHECKING)
+
+import numpy as np
+
+from actions import (Action, BumpAction, WaitAction)
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+MAGIC = b"RGJ1"
+JOURNAL_VERSION = 1
+
+# Level settings stored in the header, in order (the keyword arguments of 'procgen.generate_dungeon_layout()', minus 'rng')
+LEVEL_PARAMS = ("max_rooms", "room_min_size", "room_max_size", "map_width", "map_height", "max_enemies")
+
+HEADER = struct.Struct("<4sHQ6HI")     # magic, version, seed, level settings, hash interval
+ACTION = struct.Struct("<Bbb")          # kind, dx, dy
+DIGEST_SIZE = 8
+
+# Record kinds
+BUMP = 1
+WAIT = 2
+HASH = 255
+
+
+
+#_______________________________________________________________________// CLASSES
+
+class JournalHeader(NamedTuple):
+    seed:           int
+    params:         Dict[str, int]
+    hash_interval:  int
+
+
+
+class ReplayDivergence(RuntimeError):
+    '''
+    Raised when a replayed run's state hash doesn't match the one recorded at the same turn.
+    '''
+
+
+
+class ReplayResult(NamedTuple):
+    turns:          int
+    seconds:        float
+    hashes_checked: int
+
+
+
+class JournalWriter:
+    '''
+    Appends the player's actions (and periodic state hashes) to a journal file.
+    Set as 'engine.journal', the engine records every action once its turn is over.
+    '''
+
+    def __init__(self, file: BinaryIO, header: JournalHeader, turns: int = 0):
+        self.file = file
+        self.header = header
+        # Actions recorded so far (hashes are written every 'hash_interval' of them)
+        self.turns = turns
+
+
+    @classmethod
+    def create(
+        cls, 
+        path: str, 
+        seed: int, 
+        params: Dict[str, Any], 
+        hash_interval: int = 100, 
+        start: Optional[str] = None
+    ) -> JournalWriter:
+        '''
+        Starts a new journal for a run (replacing any file at 'path').
+        - 'start' is the directory of the save the run was loaded from (a copy is kept with the journal, to replay from).
+          Without it, the run is the one generated from 'seed' and 'params'.
+        '''
+        shutil.rmtree(start_directory(path), ignore_errors=True)
+        if start is not None:
+            shutil.copytree(start, start_directory(path))
+
+        header = JournalHeader(seed, {name: int(params[name]) for name in LEVEL_PARAMS}, hash_interval)
+        file = open(path, "wb")
+        file.write(HEADER.pack(MAGIC, JOURNAL_VERSION, seed, *header.params.values(), hash_interval))
+        file.flush()
+
+        return cls(file, header)
+
+
+    @classmethod
+    def resume(cls, path: str) -> JournalWriter:
+        '''
+        Reopens an existing journal to keep recording the same run (ex: after loading the save made when it was interrupted).
+        A record cut short by a crash is dropped first, so new records are appended right after the last complete one.
+        '''
+        header = read_header(path)
+        turns, end = 0, HEADER.size
+        with open(path, "rb") as file:
+            for kind, _, end in _scan(file.read()):
+                turns += kind != HASH
+
+        file = open(path, "r+b")
+        file.truncate(end)
+        file.seek(end)
+
+        return cls(file, header, turns)
+
+
+    def record(self, action: Action, engine: Engine) -> None:
+        '''
+        Appends one action (called after its turn, so a hash taken here is the state the action led to).
+        '''
+        if isinstance(action, BumpAction):
+            self.file.write(ACTION.pack(BUMP, action.dx, action.dy))
+        elif isinstance(action, WaitAction):
+            self.file.write(ACTION.pack(WAIT, 0, 0))
+        else:
+            raise TypeError(f"{type(action).__name__} can't be recorded in a journal.")
+
+        self.turns += 1
+        if self.turns % self.header.hash_interval == 0:
+            self.file.write(bytes((HASH,)) + state_hash(engine))
+
+        # Flushed every action (one small write), so a crash loses nothing
+        self.file.flush()
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+
+#_______________________________________________________________________// FUNCTIONS
+
+def state_hash(engine: Engine) -> bytes:
+    '''
+    Returns an 8 byte digest of the game state: the map's tiles, and the position and hp of every entity on it.
+    Entities are hashed sorted by x, y and hp, so the digest doesn't depend on which store rows they were given (ex: after a load).
+    '''
+    game_map = engine.game_map
+    store = game_map.store
+    rows = np.flatnonzero(store.in_use[: store.size])
+    rows = rows[np.lexsort((store.hp[rows], store.y[rows], store.x[rows]))]
+
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    digest.update(np.ascontiguousarray(game_map.tiles).tobytes())
+    for column in (store.x, store.y, store.hp):
+        digest.update(column[rows].tobytes())
+
+    return digest.digest()
+
+
+
+def start_directory(path: str) -> str:
+    '''
+    Returns where the save a journal's run started from is kept (only exists for runs that didn't start from the seed).
+    '''
+    return path + ".start"
+
+
+
+def journal_for_save(path: str, save_directory: str, seed: int, params: Dict[str, Any]) -> JournalWriter:
+    '''
+    Returns the journal to record a game just loaded from 'save_directory' (see 'savegame.save_game()').
+    - The journal at 'path' is resumed if it holds exactly the actions that led to the save: the save was made from
+      the same run (same seed), after the same number of actions. Replaying it then still reproduces the game.
+    - Otherwise (no journal, another run's, or one with actions missing or recorded after the save), a new journal is
+      started from the save itself ('seed' only labels the run).
+    '''
+    # (Imported here: 'savegame' imports the engine, which records into this module's journals)
+    from savegame import read_meta
+
+    recorded = read_meta(save_directory).get("journal")
+    if recorded is not None and os.path.isfile(path):
+        try:
+            journal = JournalWriter.resume(path)
+        except ValueError:
+            journal = None
+
+        if journal is not None:
+            if (journal.header.seed, journal.turns) == (recorded["seed"], recorded["turns"]):
+                return journal
+            journal.close()
+
+    return JournalWriter.create(path, seed, params, start=save_directory)
+
+
+
+def read_header(path: str) -> JournalHeader:
+    with open(path, "rb") as file:
+        data = file.read(HEADER.size)
+
+    if len(data) < HEADER.size or data[:4] != MAGIC:
+        raise ValueError(f"{path} is not a journal.")
+
+    magic, version, seed, *params, hash_interval = HEADER.unpack(data)
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported journal version {version} (expected {JOURNAL_VERSION}).")
+
+    return JournalHeader(seed, dict(zip(LEVEL_PARAMS, params)), hash_interval)
+
+
+
+def read_records(path: str) -> Iterator[Tuple[int, Any]]:
+    '''
+    Yields (kind, (dx, dy)) for actions and (HASH, digest) for hashes. A record cut short by a crash ends the journal.
+    '''
+    with open(path, "rb") as file:
+        data = file.read()
+
+    for kind, value, _ in _scan(data):
+        yield kind, value
+
+
+
+def _scan(data: bytes) -> Iterator[Tuple[int, Any, int]]:
+    '''
+    Yields each complete record of a journal's bytes as (kind, value, offset of the end of the record).
+    '''
+    offset = HEADER.size
+    while offset < len(data):
+        kind = data[offset]
+        if kind == HASH:
+            digest = data[offset + 1: offset + 1 + DIGEST_SIZE]
+            if len(digest) < DIGEST_SIZE:
+                return
+            offset += 1 + DIGEST_SIZE
+            yield HASH, digest, offset
+        else:
+            if offset + ACTION.size > len(data):
+                return
+            kind, dx, dy = ACTION.unpack_from(data, offset)
+            offset += ACTION.size
+            yield kind, (dx, dy), offset
+
+
+
+def replay(path: str, verify: bool = True) -> ReplayResult:
+    '''
+    Re-runs a journal headlessly as fast as possible (messages are swallowed).
+    The run starts from the journal's save (see 'start_directory()') if it has one, otherwise from its seed.
+    With 'verify', every recorded hash is compared with the replayed state, raising 'ReplayDivergence' on the first mismatch.
+    '''
+    # (Imported here: 'headless' imports this module to record runs)
+    from headless import HeadlessGame
+    from savegame import load_game
+
+    header = read_header(path)
+    if os.path.isdir(start_directory(path)):
+        engine = load_game(start_directory(path))
+        engine.update_fov()
+    else:
+        engine = HeadlessGame(seed=header.seed, **header.params).engine
+
+    player = engine.player
+    bump, wait = BumpAction(player, 0, 0), WaitAction(player)
+
+    turns = hashes = 0
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for kind, value in read_records(path):
+                if kind == HASH:
+                    if verify:
+                        actual = state_hash(engine)
+                        if actual != value:
+                            raise ReplayDivergence(f"State diverged by turn {turns}: recorded {value.hex()}, replayed {actual.hex()}.")
+                        hashes += 1
+                    continue
+
+                engine.handle_player_action(bump.aim(*value) if kind == BUMP else wait)
+                turns += 1
+
+    finally:
+        # (A save with other levels came with a level manager holding them in a temporary directory)
+        if engine.levels is not None:
+            engine.levels.clear()
+
+    return ReplayResult(turns, time.perf_counter() - start, hashes)
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay an action journal headlessly (regression test and benchmark).")
+    parser.add_argument("path")
+    parser.add_argument("--no-verify", action="store_true", help="skip the state hash checks")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.path):
+        sys.exit(f"No journal at {args.path}")
+
+    try:
+        result = replay(args.path, verify=not args.no_verify)
+    except ReplayDivergence as error:
+        sys.exit(f"DIVERGED: {error}")
+
+    print(
+        f"{result.turns} turns in {result.seconds:.3f}s ({result.turns / max(result.seconds, 1e-9):.0f} turns/s), "
+        f"{result.hashes_checked} state hashes verified"
+    )
+
+
+
+if __name__ == '__main__':
+    main()
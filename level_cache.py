@@ -0,0 +1,101 @@
+'''
+On-disk cache of generated dungeon layouts, keyed by (seed, generator parameters).
+
+Generation is deterministic for a given seed (every random choice comes from 'random.Random(seed)'), so a layout only
+ever needs to be generated once. Each cached layout is a directory of raw '.npy' files:
+
+    <directory>/<key>/tiles.npy          - the map's tile array
+    <directory>/<key>/spawn_kinds.npy    - index into 'procgen.SPAWN_KINDS' for each spawn
+    <directory>/<key>/spawn_xy.npy       - (n, 2) spawn positions
+
+Tiles are loaded with memory mapping (copy-on-write), so a cache hit skips generation entirely and only reads the pages
+that actually get touched. Entries are written to a temporary directory and renamed into place, so a half-written entry
+is never read (safe with several worker processes sharing one cache).
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+from typing import (Any, Dict, Optional)
+
+import numpy as np
+
+from procgen import (DungeonLayout, LAYOUT_VERSION, generate_dungeon_layout)
+
+
+
+#_______________________________________________________________________// CLASS
+
+class LevelCache:
+
+    def __init__(self, directory: str = ".level_cache"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+
+    def key(self, seed: int, params: Dict[str, Any]) -> str:
+        '''
+        Returns the cache key for a seed and the keyword arguments of 'generate_dungeon_layout()' (minus 'rng').
+        '''
+        description = json.dumps({"seed": seed, "version": LAYOUT_VERSION, **params}, sort_keys=True)
+        return hashlib.sha1(description.encode()).hexdigest()
+
+
+    def path(self, seed: int, params: Dict[str, Any]) -> str:
+        return os.path.join(self.directory, self.key(seed, params))
+
+
+    def get(self, seed: int, params: Dict[str, Any]) -> Optional[DungeonLayout]:
+        '''
+        Returns the cached layout (tiles memory mapped), or 'None' if it hasn't been generated yet.
+        '''
+        path = self.path(seed, params)
+        if not os.path.isdir(path):
+            return None
+
+        return DungeonLayout(
+            tiles       = np.load(os.path.join(path, "tiles.npy"), mmap_mode="c"),
+            spawn_kinds = np.load(os.path.join(path, "spawn_kinds.npy")),
+            spawn_xy    = np.load(os.path.join(path, "spawn_xy.npy")),
+        )
+
+
+    def put(self, seed: int, params: Dict[str, Any], layout: DungeonLayout) -> None:
+        '''
+        Writes a layout to the cache (does nothing if another process already stored the same key).
+        '''
+        path = self.path(seed, params)
+        if os.path.isdir(path):
+            return
+
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            # (Fortran order is kept in the .npy header, so the tiles load back with the same [x, y] layout)
+            np.save(os.path.join(staging, "tiles.npy"), layout.tiles)
+            np.save(os.path.join(staging, "spawn_kinds.npy"), layout.spawn_kinds)
+            np.save(os.path.join(staging, "spawn_xy.npy"), layout.spawn_xy)
+            os.rename(staging, path)
+        except OSError:
+            # Lost the race to another process writing the same layout
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+
+    def get_or_generate(self, seed: int, params: Dict[str, Any]) -> DungeonLayout:
+        '''
+        Returns the cached layout for this seed, generating and storing it first if it isn't cached yet.
+        '''
+        layout = self.get(seed, params)
+        if layout is None:
+            self.put(seed, params, generate_dungeon_layout(rng=random.Random(seed), **params))
+            layout = self.get(seed, params)
+
+        return layout   # type: ignore
@@ -0,0 +1,173 @@
+'''
+Multi-level dungeon manager: keeps the most recently visited levels in memory and pushes older ones out to disk.
+
+The engine only ever plays one 'game_map'. When the player leaves a level ('Engine.change_level()'), the level is handed
+to the 'LevelManager' with all its entities, and the player's position on it is remembered:
+    - Up to 'capacity' levels stay in memory (an 'OrderedDict' in least -> most recently used order).
+      Going back to one of them is just a dictionary lookup.
+    - Past that, the least recently used level is written to disk with 'savegame.save_map()' and dropped from memory.
+      Going back to it reads it with 'savegame.load_map()' (raw numpy files, tiles memory mapped), a few milliseconds.
+So memory stays bounded by 'capacity' levels however deep a run goes, and no visited level is ever lost.
+
+    <directory>/level_<depth>/      - one 'savegame.save_map()' directory per evicted level
+
+A saved game keeps every visited level: 'save()' writes them all (with the player's positions) into the save,
+and 'load()' copies them back into a manager's directory when the game is resumed (see 'savegame.save_game()').
+
+    <save>/levels/levels.json       - the player's position on each visited level, by depth
+    <save>/levels/level_<depth>/    - every visited level
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+from collections import OrderedDict
+import json
+import os
+import shutil
+import tempfile
+from typing import (Dict, Optional, Tuple, TYPE_CHECKING)
+
+from savegame import (load_map, save_map)
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from game_map import GameMap
+
+
+
+#_______________________________________________________________________// CLASS
+
+class LevelManager:
+    '''
+    Holds the levels the player isn't on, by depth.
+    - 'capacity' is how many of them are kept in memory (at least 1).
+    - 'directory' is where evicted levels are written (defaults to a new temporary directory, made on first use).
+    '''
+
+    def __init__(self, engine: Engine, capacity: int = 4, directory: Optional[str] = None):
+        self.engine = engine
+        self.capacity = max(1, capacity)
+        self._directory = directory
+
+        # Levels in memory, least recently used first
+        self.levels: OrderedDict[int, GameMap] = OrderedDict()
+        # Where the player was standing when they left each level (in memory or on disk)
+        self.player_positions: Dict[int, Tuple[int, int]] = {}
+
+
+    @property
+    def directory(self) -> str:
+        '''
+        Returns where evicted levels are written (created the first time it's needed, so a manager that never evicts
+        anything never touches the disk).
+        '''
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="levels-")
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+
+    def level_path(self, depth: int, directory: Optional[str] = None) -> str:
+        return os.path.join(directory or self.directory, f"level_{depth}")
+
+
+    def __contains__(self, depth: int) -> bool:
+        '''
+        Returns 'True' if the level at this depth was visited before (whether it's in memory or on disk).
+        '''
+        return depth in self.player_positions
+
+
+    def leave(self, depth: int, game_map: GameMap) -> None:
+        '''
+        Takes the level the player is leaving: the player is taken off it (their position is remembered),
+        then the level becomes the most recently used one, evicting the oldest levels to disk if there are too many.
+        '''
+        player = self.engine.player
+        self.player_positions[depth] = (player.x, player.y)
+        game_map.remove_entity(player)
+
+        self.levels[depth] = game_map
+        self.levels.move_to_end(depth)
+
+        while len(self.levels) > self.capacity:
+            self.evict(next(iter(self.levels)))
+
+
+    def restore(self, depth: int) -> Optional[Tuple[GameMap, Tuple[int, int]]]:
+        '''
+        Returns a visited level (taking it out of the manager, since the player is going back to it) and the player's position on it.
+        Returns 'None' if the level was never visited.
+        '''
+        if depth not in self:
+            return None
+
+        game_map = self.levels.pop(depth, None)
+        if game_map is None:
+            game_map = load_map(self.engine, self.level_path(depth))
+
+        return game_map, self.player_positions[depth]
+
+
+    def evict(self, depth: int) -> None:
+        '''
+        Writes a level in memory to disk and drops it from memory.
+        The new files are staged and swapped in (the previous copy may still be memory mapped by a level read from it).
+        '''
+        game_map = self.levels.pop(depth)
+        path = self.level_path(depth)
+
+        staging = path + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        save_map(game_map, staging)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(staging, path)
+
+
+    def save(self, directory: str) -> None:
+        '''
+        Writes every visited level (in memory or on disk) and the player's positions on them into a new 'directory'.
+        '''
+        os.makedirs(directory)
+        for depth in self.player_positions:
+            path = self.level_path(depth, directory)
+            game_map = self.levels.get(depth)
+            if game_map is None:
+                shutil.copytree(self.level_path(depth), path)
+            else:
+                os.makedirs(path)
+                save_map(game_map, path)
+
+        with open(os.path.join(directory, "levels.json"), "w") as file:
+            json.dump({depth: position for depth, position in self.player_positions.items()}, file)
+
+
+    def load(self, directory: str) -> None:
+        '''
+        Takes over the levels written by 'save()' (copied into this manager's directory, so the save can be replaced).
+        They stay on disk until the player goes back to one of them.
+        '''
+        with open(os.path.join(directory, "levels.json")) as file:
+            positions = json.load(file)
+
+        for depth, (x, y) in positions.items():
+            depth = int(depth)
+            path = self.level_path(depth)
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.copytree(self.level_path(depth, directory), path)
+            self.levels.pop(depth, None)
+            self.player_positions[depth] = (x, y)
+
+
+    def clear(self) -> None:
+        '''
+        Forgets every level and deletes the manager's directory (ex: when the run is over).
+        '''
+        self.levels.clear()
+        self.player_positions.clear()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
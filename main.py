@@ -1,18 +1,40 @@
 '''
 The engine instantiates the window/console and main game loop.
-Drawing/rendering occurs by updating the state of the console, and then printing it to the screen.
+Drawing/rendering occurs by updating the state of the console, and then printing it to the screen (only when it changed).
 
+Usage:
+    >> python rogue.py                                  (new random dungeon, or the saved game)
+    >> python rogue.py --seed 1 --cache .level_cache    (same dungeon every run; generated levels are cached, so later runs skip generation)
 '''
 
 
 #_______________________________________________________________________// MODULES
 
+import argparse
 import tcod 
-import copy
+import os
+import random
+import shutil
 
 from engine import Engine
 import entity_factories
-from procgen import (generate_static_dungeon, generate_random_dungeon)
+from game_loop import GameLoop
+from journal import (JournalWriter, journal_for_save)
+from level_cache import LevelCache
+from level_manager import LevelManager
+from pregen import LevelPregenerator
+from procgen import (build_dungeon, generate_dungeon_layout, generate_static_dungeon)
+from savegame import (load_game, save_game)
+
+
+
+#_______________________________________________________________________// DECLARATION
+
+# Where the game is saved on exit (and resumed from on the next start)
+SAVE_DIRECTORY = "savegame"
+
+# Every action of the current run (replay it with 'python journal.py journal.rgj')
+JOURNAL_PATH = "journal.rgj"
 
 
 
@@ -20,6 +42,11 @@ from procgen import (generate_static_dungeon, generate_random_dungeon)
 
 def main() -> None:
 
+    parser = argparse.ArgumentParser(description="Play Rogue.")
+    parser.add_argument("--seed", type=int, default=None, help="seed of a new run (random by default)")
+    parser.add_argument("--cache", metavar="DIR", default=None, help="reuse generated levels from this cache directory")
+    args = parser.parse_args()
+
     # Starting / default values
     screen_width    = 80
     screen_height   = 50
@@ -38,21 +65,49 @@ def main() -> None:
     tileset = tcod.tileset.load_tilesheet("dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD)
 
 
-    # Instance of the 'player' entity
-    player = copy.deepcopy(entity_factories.player)
-    # Instantiate the Engine class
-    engine = Engine(player = player)
-    # Auto-generated map
-    engine.game_map = generate_random_dungeon(
+    # Every level of this run derives from one seed (the same seed regenerates the same dungeon)
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    rng = random.Random(seed)
+    # (Optionally) levels generated by earlier runs with the same seed and settings are read back instead of generated again
+    level_cache = LevelCache(args.cache) if args.cache else None
+
+    # Settings shared by the first level and every pre-generated level after it
+    level_params = dict(
         max_rooms       = max_rooms,         
         room_min_size   = room_min_size,     
         room_max_size   = room_max_size,    
         map_width       = map_width,         
         map_height      = map_height,
         max_enemies     = max_enemies,
-        engine          = engine
     )
 
+    if os.path.isdir(SAVE_DIRECTORY):
+        # Resume the saved game, and keep recording its run (in the same journal if it led to this save, otherwise in a new one starting from the save)
+        engine = load_game(SAVE_DIRECTORY)
+        engine.journal = journal_for_save(JOURNAL_PATH, SAVE_DIRECTORY, seed, level_params)
+
+    else:
+        # Instance of the 'player' entity
+        player = entity_factories.player.clone()
+        # Instantiate the Engine class
+        engine = Engine(player = player)
+        # Auto-generated map (its layout is drawn from its own 'random.Random(seed)', like a cached one was)
+        if level_cache is not None:
+            layout = level_cache.get_or_generate(seed, level_params)
+        else:
+            layout = generate_dungeon_layout(rng = random.Random(seed), **level_params)
+        engine.game_map = build_dungeon(layout, engine)
+        # Record the run from its seed, so it can be replayed headlessly
+        engine.journal = JournalWriter.create(JOURNAL_PATH, seed, level_params)
+
+    # Start generating the next level in a background process while this one is played
+    engine.pregenerator = LevelPregenerator(level_params, seed = rng.getrandbits(32), cache = level_cache)
+    engine.pregenerator.prefetch()
+    # Keep the levels left behind (a few in memory, the rest on disk) so the player can go back up to them
+    # (A resumed game already has the ones it saved)
+    if engine.levels is None:
+        engine.levels = LevelManager(engine)
+
     # Recalculates tile visibility around the player ('explored', 'visible', or 'SHROUD')
     engine.update_fov()
 
@@ -72,12 +127,24 @@ def main() -> None:
         '''
         >>> MAIN - GAME LOOP
         '''
-        while True:
-
-            # Get context for the console, draw it to the screen, and clear it
-            engine.render(console=root_console, context=context)
-
-            # Await user input/event and store it
-            engine.event_handler.handle_events()
+        loop = GameLoop(engine, console=root_console, context=context, max_fps=60)
+        # Idle time tops up the pregenerator's queue (starts the next level as soon as the previous one was taken)
+        loop.background_tasks.append(engine.pregenerator.prefetch)
+
+        try:
+            # Draws the console only when something changed, and handles input as it arrives (see 'game_loop.py')
+            loop.run()
+
+        finally:
+            engine.pregenerator.shutdown()
+            if engine.journal is not None:
+                engine.journal.close()
+
+            # Keep the run going next time (with every level visited so far), unless it's over
+            if engine.player.is_alive:
+                save_game(engine, SAVE_DIRECTORY)
+            else:
+                shutil.rmtree(SAVE_DIRECTORY, ignore_errors=True)
+            engine.levels.clear()
 
  
\ No newline at end of file
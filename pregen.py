@@ -0,0 +1,124 @@
+'''
+Background pre-generation of upcoming dungeon levels in a process pool.
+
+Level generation ('procgen.generate_dungeon_layout()') is pure number crunching on numpy arrays, so it can run in worker
+processes while the player is still exploring the current level. Workers send back a 'DungeonLayout' (a tiles array plus a
+small spawn list), never entities, so nothing but a few arrays gets pickled. The main process builds the GameMap from it.
+
+- 'LevelPregenerator.prefetch()' keeps 'lookahead' levels queued in the pool.
+- 'LevelPregenerator.next_layout()' hands over the oldest one: instant if the worker already finished,
+  otherwise it only waits for the remainder of that level's generation.
+- With a 'LevelCache', workers write layouts straight to the cache (or find them already there) and send back nothing;
+  the main process then memory maps the cached arrays instead of unpickling them.
+- With 'max_workers=0' there's no pool: each level is generated in this process when it's taken (same levels, same order).
+  Meant for headless games, where nothing is played while a level would generate in the background.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import (Future, ProcessPoolExecutor)
+import random
+from typing import (Any, Deque, Dict, Optional, Tuple)
+
+from level_cache import LevelCache
+from procgen import (DungeonLayout, generate_dungeon_layout)
+
+
+
+#_______________________________________________________________________// FUNCTION
+
+def _generate_layout(seed: int, params: Dict[str, Any], cache_directory: Optional[str]) -> Optional[DungeonLayout]:
+    '''
+    Runs in a worker process: generates the layout for one seed.
+    - With a cache directory the layout is stored there (unless it already is) and 'None' is returned.
+    '''
+    if cache_directory is None:
+        return generate_dungeon_layout(rng=random.Random(seed), **params)
+
+    cache = LevelCache(cache_directory)
+    if cache.get(seed, params) is None:
+        cache.put(seed, params, generate_dungeon_layout(rng=random.Random(seed), **params))
+    return None
+
+
+
+#_______________________________________________________________________// CLASS
+
+class LevelPregenerator:
+    '''
+    Takes the keyword arguments for 'generate_dungeon_layout()' (map size, room sizes, enemies per room; minus 'rng')
+    and keeps 'lookahead' upcoming levels generating in a pool of 'max_workers' processes (0: no pool, levels are generated on demand).
+    Each level's seed is drawn from a 'random.Random(seed)', so the same 'seed' always produces the same run of levels.
+    '''
+
+    def __init__(
+        self, 
+        params: Dict[str, Any], 
+        seed: Optional[int] = None, 
+        cache: Optional[LevelCache] = None,
+        lookahead: int = 1, 
+        max_workers: int = 1
+    ):
+        self.params = params
+        self.rng = random.Random(seed)
+        self.cache = cache
+        self.lookahead = lookahead
+        self.executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 0 else None
+        # (seed, level being generated) pairs, oldest (the next one to be entered) first
+        self.pending: Deque[Tuple[int, Future[Optional[DungeonLayout]]]] = deque()
+
+
+    def prefetch(self) -> None:
+        '''
+        Submits new levels to the pool until 'lookahead' of them are queued.
+        '''
+        if self.executor is None:
+            return
+
+        cache_directory = self.cache.directory if self.cache else None
+        while len(self.pending) < self.lookahead:
+            seed = self.rng.getrandbits(32)
+            self.pending.append((seed, self.executor.submit(_generate_layout, seed, self.params, cache_directory)))
+
+
+    @property
+    def ready(self) -> bool:
+        '''
+        Returns 'True' if the next level has finished generating (taking it won't block).
+        '''
+        return bool(self.pending) and self.pending[0][1].done()
+
+
+    def next_layout(self) -> DungeonLayout:
+        '''
+        Returns the next level's layout (waiting for its worker if it isn't done yet), then queues up a replacement.
+        (Without a pool, the level is generated right here.)
+        '''
+        if self.executor is None:
+            seed = self.rng.getrandbits(32)
+            layout = _generate_layout(seed, self.params, self.cache.directory if self.cache else None)
+        else:
+            self.prefetch()
+            seed, future = self.pending.popleft()
+            layout = future.result()
+            self.prefetch()
+
+        if layout is None:
+            # The worker wrote it to the cache: memory map it from there
+            layout = self.cache.get(seed, self.params)     # type: ignore
+
+        return layout   # type: ignore
+
+
+    def shutdown(self) -> None:
+        '''
+        Cancels queued levels and stops the worker processes.
+        '''
+        for _, future in self.pending:
+            future.cancel()
+        self.pending.clear()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
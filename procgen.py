@@ -7,8 +7,13 @@ The class takes starting and ending coordinates and defines a "room" area for ti
     center(): return a centered x/y position of a given area
     inner(x, y, width, height): returns two x/y pairs (start and end coordinates), aka an area. 
 
- Function:
-    generate_dungeon(map_width, map_height): takes game map size and places an area of tiles inside it.
+ Functions:
+    generate_dungeon_layout(...): builds the tiles and spawn list for a map (no engine needed, safe to run in a worker process).
+    build_dungeon(layout, engine): turns a layout into a GameMap with its entities.
+    generate_random_dungeon(...): both of the above in one call.
+    generate_chunk_layout(...): builds one chunk of an endless overworld (see 'chunked_map.py').
+    generate_cave_layout(...): builds a natural cave (cellular automata) instead of rooms and tunnels.
+    generate_cave(...): a cave layout built into a GameMap.
 
 '''
 
@@ -16,8 +21,10 @@ The class takes starting and ending coordinates and defines a "room" area for ti
 #_______________________________________________________________________// MODULES
 
 from __future__ import annotations
-from typing import (Iterator, Tuple, List, TYPE_CHECKING)
+from typing import (Dict, Tuple, List, NamedTuple, Optional, TYPE_CHECKING)
 import random
+
+import numpy as np
 import tcod
 
 import entity_factories
@@ -30,8 +37,31 @@ if TYPE_CHECKING:
 
 
 
+#_______________________________________________________________________// DECLARATIONS
+
+# Prototype names (in 'entity_factories') a layout can spawn. Layouts store an index into this tuple.
+SPAWN_KINDS = ("player", "orc", "troll")
+
+# Bump whenever a change here makes the same seed produce a different layout (invalidates 'level_cache.py' entries)
+LAYOUT_VERSION = 1
+
+
+
 #_______________________________________________________________________// CLASSES
 
+class DungeonLayout(NamedTuple):
+    '''
+    Everything needed to build a GameMap, as plain arrays (no entities or engine references):
+    - 'tiles': the map's tile array.
+    - 'spawn_kinds': index into 'SPAWN_KINDS' for each spawn.
+    - 'spawn_xy': (n, 2) array of spawn positions.
+    '''
+    tiles:          np.ndarray
+    spawn_kinds:    np.ndarray
+    spawn_xy:       np.ndarray
+
+
+
 class RectangularRoom:
     ''' 
     Defines an area on a map to be filled with tiles. 
@@ -66,6 +96,15 @@ class RectangularRoom:
         return slice(self.x1 + 1, self.x2), slice(self.y1 + 1, self.y2)
 
 
+    @property
+    def outer(self) -> Tuple[slice, slice]:
+        ''' 
+        Returns the whole area of this room, walls included, as a 2D array index [(x1, x2 + 1), (y1, y2 + 1)] 
+        (the same closed area '.intersects()' compares, so it can be checked against an occupancy grid)
+        '''
+        return slice(self.x1, self.x2 + 1), slice(self.y1, self.y2 + 1)
+
+
     #_____/ METHOD / .intersects(RectangularRoom)
     def intersects(self, other: RectangularRoom) -> bool:
         '''
@@ -85,59 +124,64 @@ class RectangularRoom:
 
 def place_entities(
     room:           RectangularRoom,
-    dungeon:        GameMap,
-    max_enemies:    int
+    spawns:         Dict[Tuple[int, int], str],
+    max_enemies:    int,
+    rng:            random.Random,
 ) -> None:
     '''
-    Takes a room, a map, and total enemies allowed per room, then sets a random number of enemies down in the given room.
+    Takes a room, the spawn list being built for a layout, and total enemies allowed per room, 
+    then adds a random number of enemies in the given room to the spawn list (position -> 'entity_factories' prototype name).
+    All randomness comes from 'rng', so the same seed always places the same enemies.
     '''
     # Take the most enemies allowed in one room at a time and set a random number of them
-    number_of_enemies = random.randint(0, max_enemies)
+    number_of_enemies = rng.randint(0, max_enemies)
 
     for i in range(number_of_enemies):
         # Give the enemy random starting coordinates
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
-        # Check for any other enemies at that coordinate location (prevents getting a stack of enemies)
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            if random.random() < 0.8:
+        # Check for anything else already spawning at that coordinate location (prevents getting a stack of enemies)
+        if (x, y) not in spawns:
+            if rng.random() < 0.8:
                 # 80% chance of spawning an Orc
-                entity_factories.orc.spawn(dungeon, x, y)
+                spawns[x, y] = "orc"
             else:
                 # 20% chance of spawning a Troll
-                entity_factories.troll.spawn(dungeon, x, y)
+                spawns[x, y] = "troll"
 
 
 
-def tunnel_between(start: Tuple[int, int], end: Tuple [int, int]) -> Iterator[Tuple[int, int]]:
+def tunnel_between(start: Tuple[int, int], end: Tuple [int, int], rng: random.Random) -> np.ndarray:
     ''' 
-    Return a List of coordinates (making an L-shaped "tunnel") between two given points. 
+    Return an array of [x, y] coordinates (making an L-shaped "tunnel") between two given points (the bend is picked with 'rng'). 
+    - The two 'bresenham' line segments are concatenated, so the whole tunnel can be carved with one fancy-indexed write:
+        dungeon.tiles[tuple(tunnel.T)] = tile_type
     '''
     x1, y1 = start
     x2, y2 = end
     
     # Randomly set where the 'L-bend' appears (50% chance)
-    if random.random() < 0.5:   
+    if rng.random() < 0.5:   
         # Horizontally, then vertically
         corner_x, corner_y = x2, y1
     else:
         # Vertically, then horizontally
         corner_x, corner_y = x1, y2
 
-    # Generate coordinates for the tunnel tiles as a [List] 
-    # (uses 'yield' to remember previous list values rather than recalculate on each iteration - more CPU efficient)
-    for x, y, in tcod.los.bresenham((x1, y1), (corner_x, corner_y)).tolist():
-        yield x, y
-    for x, y, in tcod.los.bresenham((corner_x, corner_y), (x2, y2)).tolist():
-        yield x, y
+    # Generate coordinates for both legs of the tunnel as (length, 2) arrays and join them
+    return np.concatenate((
+        tcod.los.bresenham((x1, y1), (corner_x, corner_y)),
+        tcod.los.bresenham((corner_x, corner_y), (x2, y2)),
+    ))
 
 
 
-def generate_static_dungeon(map_width, map_height, variation) -> GameMap:
+def generate_static_dungeon(map_width, map_height, variation, rng: Optional[random.Random] = None) -> GameMap:
     ''' 
     Generates a static pre-set dungeon map. Takes desired size and type. 
     '''
+    rng = rng or random.Random()
     # Rooms in the dungeon (as GameMap instances)
     dungeon = GameMap(map_width, map_height)
     house = GameMap(map_width, map_height)
@@ -151,71 +195,297 @@ def generate_static_dungeon(map_width, map_height, variation) -> GameMap:
     dungeon.tiles[ROOM_MD.inner] = tile_types.dirt
     house.tiles[ROOM_LG.inner] = tile_types.floor_wood
 
-    # Take given points (from room center) and use [x/y] lists from 'tunnel_between' function to connect them.
-    for x, y in tunnel_between(ROOM_SM.center, ROOM_MD.center):
-        dungeon.tiles[x, y] = tile_types.dirt
+    # Take given points (from room center) and use the [x/y] array from 'tunnel_between' function to connect them.
+    dungeon.tiles[tuple(tunnel_between(ROOM_SM.center, ROOM_MD.center, rng).T)] = tile_types.dirt
 
     if variation == 'dungeon': return dungeon
     if variation == 'house': return house
     
 
 
-def generate_random_dungeon(
+def generate_dungeon_layout(
     max_rooms:      int,         
     room_min_size:  int,     
     room_max_size:  int,    
     map_width:      int,         
     map_height:     int,
     max_enemies:    int,
-    engine:         Engine,
-) -> GameMap:
+    rng:            random.Random,
+) -> DungeonLayout:
     ''' 
-    Generates a new procedurally-built dungeon map. 
+    Generates the tiles and spawn list for a new procedurally-built dungeon map. 
+    Doesn't need an Engine or create any entities, so it can run in a worker process (see 'pregen.py').
+    Every random choice is drawn from 'rng' (ex: 'random.Random(seed)'), so a seed always regenerates the same layout.
     '''
-    # Get the player
-    player = engine.player
-    # Get the map width/height passed into the function and set a map instance with those dimensions.
-    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+    # Fill area of given dimensions with default wall tiles (same layout as 'GameMap.tiles')
+    tiles = np.full((map_width, map_height), fill_value=tile_types.wall, order="F")
+
+    # Spawn list being built: position -> 'entity_factories' prototype name (insertion order is spawn order)
+    spawns: Dict[Tuple[int, int], str] = {}
 
     # Set a typed List to hold all the generated room instances (reference/key is 'rooms')
     rooms: List[RectangularRoom] = []
+    # Occupancy grid of every accepted room's area (walls included). 
+    # A new room is checked against this grid in one slice instead of against every previous room.
+    occupied = np.zeros((map_width, map_height), dtype=bool, order="F")
 
     for room in range(max_rooms):
         # Set random room width/height
-        room_width  = random.randint(room_min_size, room_max_size)
-        room_height = random.randint(room_min_size, room_max_size)
+        room_width  = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
         # Set random coordinates to place the room
-        x = random.randint(0, dungeon.width - room_width - 1)       
-        y = random.randint(0, dungeon.height - room_height - 1)
+        x = rng.randint(0, map_width - room_width - 1)       
+        y = rng.randint(0, map_height - room_height - 1)
 
         # Create a room (class instance) using the random values
         new_room = RectangularRoom(x, y, room_width, room_height)
 
-        # Iterate through other rooms in the List to determine if it overlaps (True or False)
-        if any(new_room.intersects(other_room) for other_room in rooms):
+        # Check the room's area against the occupancy grid to determine if it overlaps another room (True or False)
+        if occupied[new_room.outer].any():
             # If 'True', scrap the room and start the loop again to create a new one
             continue
 
-        # When '.intersects()' does return 'False' (room doesn't overlap), the room is valid and can be tiled
-        # (Set tiles to replace the default inner wall tiles initialized by the GameMap class)
-        dungeon.tiles[new_room.inner] = tile_types.grass
+        occupied[new_room.outer] = True
+
+        # When the room doesn't overlap, the room is valid and can be tiled
+        # (Set tiles to replace the default inner wall tiles)
+        tiles[new_room.inner] = tile_types.grass
 
         # Set player's starting position in the first room (from Tuple returned by room's '.center()' method)
         if len(rooms) == 0:
-            player.place(*new_room.center, dungeon)
+            spawns[new_room.center] = "player"
 
         else:
             # Connect the centers of the previous room and the current one (tunnel)
             # ('rooms[-1]' goes backward in the rooms array by one item)
-            for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                # Set the tiling for the tunnel
-                dungeon.tiles[x, y] = tile_types.dirt
+            tunnel = tunnel_between(rooms[-1].center, new_room.center, rng)
+            # Set the tiling for the whole tunnel in one write
+            tiles[tuple(tunnel.T)] = tile_types.dirt
 
-        place_entities(new_room, dungeon, max_enemies)
+        place_entities(new_room, spawns, max_enemies, rng)
             
         # Add the new room to the list of other rooms
         rooms.append(new_room)
 
+    # Pack the spawn list into two small arrays (cheap to send between processes)
+    spawn_kinds = np.array([SPAWN_KINDS.index(name) for name in spawns.values()], dtype=np.uint8)
+    spawn_xy = np.array(list(spawns.keys()), dtype=np.intc).reshape(-1, 2)
+
+    return DungeonLayout(tiles, spawn_kinds, spawn_xy)
+
+
+
+def generate_chunk_layout(
+    chunk_x:        int,
+    chunk_y:        int,
+    seed:           int,
+    chunk_size:     int = 32,
+    max_rooms:      int = 4,
+    room_min_size:  int = 6,
+    room_max_size:  int = 10,
+    max_enemies:    int = 2,
+) -> DungeonLayout:
+    '''
+    Generates one 'chunk_size' square chunk of an overworld (chunk coordinates, not tiles).
+    - The chunk's rng is seeded from (seed, chunk_x, chunk_y), so any chunk can be regenerated on its own, in any order.
+    - Rooms are laid out like a small dungeon. The first room is then tunneled to the middle of all four chunk edges, 
+      and since every chunk does the same, neighbouring chunks always connect across their shared edge.
+    - The first room's "player" spawn is kept in the layout (a starting point), the map decides whether to use it.
+    '''
+    rng = random.Random(f"{seed}:{chunk_x}:{chunk_y}")
+    layout = generate_dungeon_layout(
+        max_rooms       = max_rooms,
+        room_min_size   = room_min_size,
+        room_max_size   = room_max_size,
+        map_width       = chunk_size,
+        map_height      = chunk_size,
+        max_enemies     = max_enemies,
+        rng             = rng,
+    )
+
+    # The first room always fits (nothing is placed before it), so the "player" spawn is always there
+    hub = tuple(layout.spawn_xy[layout.spawn_kinds == SPAWN_KINDS.index("player")][0].tolist())
+    middle = chunk_size // 2
+    for edge in ((0, middle), (chunk_size - 1, middle), (middle, 0), (middle, chunk_size - 1)):
+        layout.tiles[tuple(tunnel_between(hub, edge, rng).T)] = tile_types.dirt     # type: ignore
+
+    return layout
+
+
+
+def count_wall_neighbors(walls: np.ndarray) -> np.ndarray:
+    '''
+    Returns, for every tile, how many of its 8 neighbors are walls (tiles off the edge of the map count as walls).
+    - The grid is padded by one tile, and the 8 shifted views of it are added up: 8 whole-grid additions, no per-tile loop.
+    '''
+    width, height = walls.shape
+    padded = np.pad(walls, 1, constant_values=True).view(np.uint8)
+    count = np.zeros((width, height), dtype=np.uint8)
+
+    for dx in range(3):
+        for dy in range(3):
+            if dx != 1 or dy != 1:
+                count += padded[dx: dx + width, dy: dy + height]
+
+    return count
+
+
+
+def largest_region(open_tiles: np.ndarray) -> np.ndarray:
+    '''
+    Returns a mask of the largest region of connected 'True' tiles (8-way connected, like the movement rules).
+    Connected-component labeling without a per-tile loop:
+        - Every open tile starts as its own region. Each pair of neighboring open tiles is an "edge" (found with shifted slices).
+        - Each round, the larger region label of every edge joining two different regions is pointed at the smaller one
+          ('np.minimum.at'), then every label is followed to its root ("pointer jumping") until none change.
+        - Edges inside one region are dropped as soon as they're settled, so later rounds only touch the region boundaries.
+    '''
+    ids = np.full(open_tiles.shape, -1, dtype=np.int32)
+    count = int(open_tiles.sum())
+    if not count:
+        return open_tiles.copy()
+    ids[open_tiles] = np.arange(count, dtype=np.int32)
+
+    # Right, down, down-right and up-right neighbors (the other 4 directions are the same edges reversed)
+    starts, ends = [], []
+    for near, far in (
+        ((slice(0, -1), slice(None)),   (slice(1, None), slice(None))),
+        ((slice(None), slice(0, -1)),   (slice(None), slice(1, None))),
+        ((slice(0, -1), slice(0, -1)),  (slice(1, None), slice(1, None))),
+        ((slice(0, -1), slice(1, None)), (slice(1, None), slice(0, -1))),
+    ):
+        a, b = ids[near], ids[far]
+        both = (a >= 0) & (b >= 0)
+        starts.append(a[both])
+        ends.append(b[both])
+    start, end = np.concatenate(starts), np.concatenate(ends)
+
+    parent = np.arange(count, dtype=np.int32)
+    while len(start):
+        root_start, root_end = parent[start], parent[end]
+        joining = root_start != root_end
+        if not joining.any():
+            break
+        start, end = start[joining], end[joining]
+        root_start, root_end = root_start[joining], root_end[joining]
+
+        np.minimum.at(parent, np.maximum(root_start, root_end), np.minimum(root_start, root_end))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    sizes = np.bincount(parent, minlength=count)
+    largest = np.zeros(open_tiles.shape, dtype=bool)
+    largest[open_tiles] = parent == sizes.argmax()
+
+    return largest
+
+
+
+def generate_cave_layout(
+    map_width:          int,
+    map_height:         int,
+    rng:                random.Random,
+    wall_chance:        float = 0.45,
+    smoothing_steps:    int = 5,
+    enemy_density:      float = 0.005,
+) -> DungeonLayout:
+    '''
+    Generates the tiles and spawn list for a natural-looking cave, using a cellular automaton over the whole grid at once.
+    - Every tile starts as a wall with 'wall_chance' (the map's border always is one).
+    - Each smoothing step, a tile becomes a wall if 5 or more of its 8 neighbors are walls, and stays one if 4 are
+      (see 'count_wall_neighbors()'). Noise clumps into walls, open areas into caverns.
+    - Only the largest connected cavern is kept (see 'largest_region()'), so every spot of the cave can be reached.
+    - Open ground is grass, and the tiles along the cave walls are dirt.
+    - The player starts on a random cave tile, and 'enemy_density' of the remaining tiles get an enemy (80% orcs, 20% trolls).
+    Like 'generate_dungeon_layout()', it doesn't need an Engine, and every random choice comes from 'rng'.
+    '''
+    # A numpy generator seeded from 'rng', for the whole-grid random draws
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+
+    walls = np_rng.random((map_width, map_height)) < wall_chance
+    walls[[0, -1], :] = walls[:, [0, -1]] = True
+
+    for _ in range(smoothing_steps):
+        neighbors = count_wall_neighbors(walls)
+        walls = (neighbors >= 5) | (walls & (neighbors >= 4))
+        walls[[0, -1], :] = walls[:, [0, -1]] = True
+
+    cave = largest_region(~walls)
+
+    tiles = np.full((map_width, map_height), fill_value=tile_types.wall, order="F")
+    tiles[cave] = tile_types.grass
+    tiles[cave & (count_wall_neighbors(~cave) > 0)] = tile_types.dirt
+
+    # Spawn list: the player first, then enemies on distinct cave tiles
+    cave_x, cave_y = np.nonzero(cave)
+    picks = np_rng.permutation(len(cave_x))[: 1 + int(len(cave_x) * enemy_density)]
+    spawn_xy = np.stack((cave_x[picks], cave_y[picks]), axis=1).astype(np.intc)
+
+    spawn_kinds = np.where(
+        np_rng.random(len(picks)) < 0.8, SPAWN_KINDS.index("orc"), SPAWN_KINDS.index("troll")
+    ).astype(np.uint8)
+    spawn_kinds[:1] = SPAWN_KINDS.index("player")
+
+    return DungeonLayout(tiles, spawn_kinds, spawn_xy)
+
+
+
+def build_dungeon(layout: DungeonLayout, engine: Engine) -> GameMap:
+    '''
+    Turns a generated layout into a playable GameMap: places the engine's player and spawns every enemy from its prototype.
+    '''
+    width, height = layout.tiles.shape
+    dungeon = GameMap(engine, width, height, tiles=layout.tiles)
+
+    for kind, (x, y) in zip(layout.spawn_kinds.tolist(), layout.spawn_xy.tolist()):
+        name = SPAWN_KINDS[kind]
+        if name == "player":
+            # (Also takes the player off any previous map)
+            engine.player.place(x, y, dungeon)
+        else:
+            getattr(entity_factories, name).spawn(dungeon, x, y)
+
     return dungeon
 
 
+
+def generate_random_dungeon(
+    max_rooms:      int,         
+    room_min_size:  int,     
+    room_max_size:  int,    
+    map_width:      int,         
+    map_height:     int,
+    max_enemies:    int,
+    engine:         Engine,
+    rng:            random.Random,
+) -> GameMap:
+    ''' 
+    Generates a new procedurally-built dungeon map (a layout from 'generate_dungeon_layout()' built with 'build_dungeon()'). 
+    '''
+    layout = generate_dungeon_layout(
+        max_rooms       = max_rooms,
+        room_min_size   = room_min_size,
+        room_max_size   = room_max_size,
+        map_width       = map_width,
+        map_height      = map_height,
+        max_enemies     = max_enemies,
+        rng             = rng,
+    )
+    return build_dungeon(layout, engine)
+
+
+
+def generate_cave(
+    map_width:      int,
+    map_height:     int,
+    engine:         Engine,
+    rng:            random.Random,
+    **options:      float,
+) -> GameMap:
+    '''
+    Generates a new cave map (a layout from 'generate_cave_layout()' built with 'build_dungeon()').
+    '''
+    return build_dungeon(generate_cave_layout(map_width, map_height, rng, **options), engine)
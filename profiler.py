@@ -0,0 +1,247 @@
+'''
+Per-turn instrumentation: phase timers, per-AI-type timings and counters, with an on-screen overlay and a JSON export.
+
+The engine owns one 'Profiler' ('engine.profiler'), disabled by default:
+    - Phases are timed with 'with profiler.phase("fov"): ...'. While disabled this returns one shared, do-nothing
+      context manager, so an instrumented call costs a method call and an attribute check.
+    - Counters ('profiler.count("paths")') are also skipped while disabled. Hot loops check 'profiler.enabled' once
+      instead (ex: the enemy phase only times each AI's turn when it's on).
+    - 'Engine.handle_player_action()' ends a turn with 'end_turn()', which keeps that turn's numbers for the overlay.
+    - Drawing is measured as a separate series of frames ('phase(..., frame=True)', 'count(..., frame=True)'),
+      ended by 'Engine.render()' with 'end_frame()'. Frames and turns are decoupled (several turns can be taken between
+      two frames, and an idle game draws none), so a frame's draw time is never counted in a turn's numbers.
+
+Turn phases timed by the engine: 'player_action', 'enemy_turns', 'fov', plus 'ai.<class name>' (every AI turn of that class).
+Turn counters: 'paths' (paths computed), 'pathfinders' (shared chase searches built), 'entities_scanned' (awake actors
+considered by the enemy phase), 'fov_tiles' (cells written).
+Frame phases: 'render', 'present'. Frame counters: 'tiles_rendered' (cells written).
+
+In game: F3 toggles profiling and its overlay, F4 writes 'profile.json'.
+Headless: 'python headless.py --profile profile.json'.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import contextlib
+import json
+import time
+from typing import (Any, ContextManager, Dict, List, TYPE_CHECKING)
+
+if TYPE_CHECKING:
+    from tcod.console import Console
+
+
+
+#_______________________________________________________________________// DECLARATION
+
+# Returned by 'Profiler.phase()' while profiling is off (one shared instance: nothing is allocated per call)
+_DISABLED_PHASE = contextlib.nullcontext()
+
+
+
+#_______________________________________________________________________// CLASSES
+
+class PhaseStats:
+    '''
+    Running totals for one timed phase.
+    '''
+
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+    def add(self, seconds: float) -> None:
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "calls":    self.calls,
+            "total_ms": self.total * 1000,
+            "mean_ms":  self.total * 1000 / max(1, self.calls),
+            "max_ms":   self.max * 1000,
+        }
+
+
+
+class _PhaseTimer:
+    # Times one 'with profiler.phase(name):' block
+
+    __slots__ = ("profiler", "name", "frame", "start")
+
+    def __init__(self, profiler: Profiler, name: str, frame: bool):
+        self.profiler = profiler
+        self.name = name
+        self.frame = frame
+
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.profiler.record(self.name, time.perf_counter() - self.start, frame=self.frame)
+
+
+
+class Profiler:
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.turns = 0
+        self.frames = 0
+        # Totals since profiling started (turns, then frames)
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.frame_phases: Dict[str, PhaseStats] = {}
+        self.frame_counters: Dict[str, int] = {}
+        # Numbers for the turn in progress, and for the last finished turn (shown by the overlay)
+        self.turn_times: Dict[str, float] = {}
+        self.turn_counters: Dict[str, int] = {}
+        self.last_turn_times: Dict[str, float] = {}
+        self.last_turn_counters: Dict[str, int] = {}
+        # Same for frames
+        self.this_frame_times: Dict[str, float] = {}
+        self.this_frame_counters: Dict[str, int] = {}
+        self.last_frame_times: Dict[str, float] = {}
+        self.last_frame_counters: Dict[str, int] = {}
+
+
+    def phase(self, name: str, frame: bool = False) -> ContextManager[None]:
+        '''
+        Returns a context manager timing the block it wraps under 'name' (does nothing while disabled).
+        - 'frame' files it with the current frame instead of the current turn (drawing).
+        '''
+        if not self.enabled:
+            return _DISABLED_PHASE
+
+        return _PhaseTimer(self, name, frame)
+
+
+    def record(self, name: str, seconds: float, frame: bool = False) -> None:
+        '''
+        Adds one timing to a phase (for code that times itself, ex: a loop timing each iteration).
+        '''
+        phases, times = (self.frame_phases, self.this_frame_times) if frame else (self.phases, self.turn_times)
+        stats = phases.get(name)
+        if stats is None:
+            stats = phases[name] = PhaseStats()
+        stats.add(seconds)
+        times[name] = times.get(name, 0.0) + seconds
+
+
+    def count(self, name: str, amount: int = 1, frame: bool = False) -> None:
+        '''
+        Adds to a counter (does nothing while disabled).
+        '''
+        if not self.enabled:
+            return
+
+        counters, current = (self.frame_counters, self.this_frame_counters) if frame else (self.counters, self.turn_counters)
+        counters[name] = counters.get(name, 0) + amount
+        current[name] = current.get(name, 0) + amount
+
+
+    def end_turn(self) -> None:
+        '''
+        Closes the current turn: its numbers become the "last turn" shown by the overlay.
+        '''
+        if not self.enabled:
+            return
+
+        self.turns += 1
+        self.last_turn_times, self.turn_times = self.turn_times, {}
+        self.last_turn_counters, self.turn_counters = self.turn_counters, {}
+
+
+    def end_frame(self) -> None:
+        '''
+        Closes the current frame (once it's presented): its numbers become the "last frame" shown by the overlay.
+        '''
+        if not self.enabled:
+            return
+
+        self.frames += 1
+        self.last_frame_times, self.this_frame_times = self.this_frame_times, {}
+        self.last_frame_counters, self.this_frame_counters = self.this_frame_counters, {}
+
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+
+
+    def reset(self) -> None:
+        self.turns = self.frames = 0
+        for numbers in (
+            self.phases, self.counters, self.turn_times, self.turn_counters, self.last_turn_times, self.last_turn_counters,
+            self.frame_phases, self.frame_counters, self.this_frame_times, self.this_frame_counters, self.last_frame_times, self.last_frame_counters,
+        ):
+            numbers.clear()
+
+
+    def report(self) -> Dict[str, Any]:
+        '''
+        Returns everything measured so far as plain data (what 'export()' writes).
+        '''
+        return {
+            "turns":    self.turns,
+            "phases":   {name: stats.as_dict() for name, stats in sorted(self.phases.items())},
+            "counters": dict(sorted(self.counters.items())),
+            "last_turn": {
+                "phases_ms":    {name: seconds * 1000 for name, seconds in sorted(self.last_turn_times.items())},
+                "counters":     dict(sorted(self.last_turn_counters.items())),
+            },
+            "frames":           self.frames,
+            "frame_phases":     {name: stats.as_dict() for name, stats in sorted(self.frame_phases.items())},
+            "frame_counters":   dict(sorted(self.frame_counters.items())),
+            "last_frame": {
+                "phases_ms":    {name: seconds * 1000 for name, seconds in sorted(self.last_frame_times.items())},
+                "counters":     dict(sorted(self.last_frame_counters.items())),
+            },
+        }
+
+
+    def export(self, path: str) -> None:
+        '''
+        Writes the report to a JSON file.
+        '''
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+
+    def overlay_lines(self) -> List[str]:
+        '''
+        Text lines for the overlay: last turn and average time per phase, then last turn's counters (same for frames below).
+        '''
+        lines: List[str] = []
+        for title, count, phases, last_times, last_counters in (
+            ("turn", self.turns, self.phases, self.last_turn_times, self.last_turn_counters),
+            ("frame", self.frames, self.frame_phases, self.last_frame_times, self.last_frame_counters),
+        ):
+            lines.append(f"{f'{title} {count}':<16}   last    avg ms")
+            for name, stats in sorted(phases.items()):
+                last = last_times.get(name, 0.0) * 1000
+                average = stats.total * 1000 / max(1, count)
+                lines.append(f"{name[:16]:<16}{last:>7.2f}{average:>8.2f}")
+
+            for name, value in sorted(last_counters.items()):
+                lines.append(f"{name[:16]:<16}{value:>7}")
+
+        return lines
+
+
+    def draw(self, console: Console, x: int = 0, y: int = 0) -> None:
+        '''
+        Draws the overlay onto the console (top-left corner by default).
+        '''
+        for i, line in enumerate(self.overlay_lines()):
+            console.print(x=x, y=y + i, string=line, fg=(255, 255, 0), bg=(0, 0, 0))
@@ -0,0 +1,314 @@
+'''
+Fast binary save/load of the full game state (Engine, GameMap, and every entity with its Fighter and AI state).
+
+A save is a directory of raw numpy files plus a small JSON header:
+
+    meta.json       - format version, map size, dungeon depth (and the run's seed and action count, if it was recorded in a journal)
+    levels/         - the other visited levels, if the engine has a level manager (see 'LevelManager.save()')
+    tiles.npy       - GameMap.tiles      (loaded memory mapped, copy-on-write)
+    visible.npy     - GameMap.visible    (  "  )
+    explored.npy    - GameMap.explored   (  "  )
+    entities.npy    - one fixed-size record per entity (position, glyph, color, stats, flags, AI class, path cursor, next turn)
+    paths.npy       - every cached AI path concatenated into one (n, 2) array (records store their offset/length)
+
+Numeric entity fields are copied straight out of the map's 'EntityStore' columns, so saving doesn't walk object graphs
+or pickle anything. Saves are written to a staging directory and swapped into place, so an interrupted save never
+corrupts the previous one (and a save can safely overwrite the directory the current game was loaded from).
+
+A loaded map plays on exactly like the saved one would have: records are written in the order of the entities' store rows
+(so rows are handed out again in the same relative order), and the awake actors are saved with their next turn
+(relative to the map's clock) and their place in the turn order, so the map's 'TurnScheduler' and 'DormantIndex' are rebuilt as they were.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import json
+import os
+import shutil
+from typing import (Any, Dict, Iterable, List, Optional, Tuple, Type)
+
+import numpy as np
+
+from components.ai import (BaseAI, HostileEnemy)
+from components.fighter import Fighter
+from engine import Engine
+from entity import (Actor, Entity)
+from game_map import GameMap
+from input_handlers import GameOverEventHandler
+from render_order import RenderOrder
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+SAVE_VERSION = 3
+
+# AI components that can be saved, by class name ('' = no AI, ex: a corpse)
+AI_CLASSES: Dict[str, Type[BaseAI]] = {
+    "HostileEnemy": HostileEnemy,
+}
+
+# Longest entity name a record holds (saving a longer one raises, rather than loading back a cut-off name)
+MAX_NAME_LENGTH = 64
+
+# One record per entity in 'entities.npy'
+entity_datatype = np.dtype(
+    [
+        ("is_actor",        bool),
+        ("is_player",       bool),
+        ("name",            f"U{MAX_NAME_LENGTH}"),
+        ("ai",              "U32"),         # AI class name (key of 'AI_CLASSES')
+        ("x",               np.intc),
+        ("y",               np.intc),
+        ("ch",              np.intc),
+        ("fg",              "3B"),
+        ("blocks",          bool),
+        ("render_order",    np.int8),
+        ("hp",              np.intc),
+        ("max_hp",          np.intc),
+        ("defense",         np.intc),
+        ("power",           np.intc),
+        ("speed",           np.intc),
+        ("path_start",      np.intc),       # Slice of 'paths.npy' holding this AI's cached path
+        ("path_length",     np.intc),
+        ("path_step",       np.intc),
+        ("awake",           bool),          # Taking part in the enemy phase (see 'dormancy.py')
+        ("next_turn",       np.intc),       # Time of the next turn, relative to the map's clock (-1 = no turn scheduled)
+        ("turn_order",      np.intc),       # Rank of that turn in the scheduler (breaks ties between turns at the same time)
+    ]
+)
+
+
+
+#_______________________________________________________________________// FUNCTIONS - SAVE
+
+def entity_records(
+    game_map: GameMap, 
+    entities: Iterable[Entity], 
+    player: Optional[Actor] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Packs entities registered on 'game_map' into 'entity_datatype' records, plus their concatenated AI paths 
+    (the arrays written to 'entities.npy' and 'paths.npy'). 
+    Raises 'ValueError' for a name longer than 'MAX_NAME_LENGTH' (it wouldn't fit in its record).
+    '''
+    entities = list(entities)
+    store = game_map.store
+    rows = np.array([entity.store_index for entity in entities], dtype=np.intp)
+
+    records = np.zeros(len(entities), dtype=entity_datatype)
+    # Numeric fields come straight from the store's columns
+    for field, column in (
+        ("x", store.x), ("y", store.y), ("ch", store.ch), ("fg", store.fg), ("blocks", store.blocks),
+        ("render_order", store.render_order), ("hp", store.hp), ("max_hp", store.max_hp),
+        ("defense", store.defense), ("power", store.power), ("speed", store.speed),
+    ):
+        records[field] = column[rows]
+
+    # Strings, types, and AI paths still need each object
+    paths: List[np.ndarray] = []
+    path_offset = 0
+    for i, entity in enumerate(entities):
+        record = records[i]
+        if len(entity.name) > MAX_NAME_LENGTH:
+            raise ValueError(f"Can't save {entity.name!r}: names are limited to {MAX_NAME_LENGTH} characters.")
+        record["name"] = entity.name
+        record["is_player"] = entity is player
+        record["is_actor"] = isinstance(entity, Actor)
+
+        ai = getattr(entity, "ai", None)
+        if ai is not None:
+            record["ai"] = type(ai).__name__
+            path = getattr(ai, "path", None)
+            if path is not None and len(path):
+                record["path_start"] = path_offset
+                record["path_length"] = len(path)
+                record["path_step"] = ai.path_step
+                paths.append(path)
+                path_offset += len(path)
+
+    return records, np.concatenate(paths).astype(np.intc) if paths else np.empty((0, 2), dtype=np.intc)
+
+
+
+def save_map(game_map: GameMap, directory: str, player: Optional[Actor] = None) -> None:
+    '''
+    Writes a GameMap's layers and entities into an (existing, empty) directory.
+    Entities are written in store row order, with the awake ones' scheduled turns.
+    '''
+    np.save(os.path.join(directory, "tiles.npy"), game_map.tiles)
+    np.save(os.path.join(directory, "visible.npy"), game_map.visible)
+    np.save(os.path.join(directory, "explored.npy"), game_map.explored)
+
+    entities = sorted(game_map.entities, key=lambda entity: entity.store_index)
+    records, paths = entity_records(game_map, entities, player)
+
+    # Index of each row's record, to file the scheduler's state under it
+    record_of = {entity.store_index: i for i, entity in enumerate(entities)}
+    scheduler = game_map.scheduler
+    records["next_turn"] = -1
+    for row in game_map.dormant.awake:
+        records[record_of[row]]["awake"] = True
+    for order, (time, row) in enumerate(scheduler.upcoming()):
+        records[record_of[row]]["next_turn"] = time - scheduler.time
+        records[record_of[row]]["turn_order"] = order
+
+    np.save(os.path.join(directory, "entities.npy"), records)
+    np.save(os.path.join(directory, "paths.npy"), paths)
+
+
+
+def save_game(engine: Engine, directory: str) -> None:
+    '''
+    Saves the engine's current map (with the player) and header into 'directory', replacing any previous save there.
+    With a level manager ('engine.levels'), every other visited level is saved too.
+    '''
+    staging = directory.rstrip("/\\") + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    save_map(engine.game_map, staging, player=engine.player)
+    if engine.levels is not None:
+        engine.levels.save(os.path.join(staging, "levels"))
+
+    meta = {
+        "version":  SAVE_VERSION,
+        "width":    engine.game_map.width,
+        "height":   engine.game_map.height,
+        "depth":    engine.depth,
+    }
+    # Which journal (and how much of it) leads to this save (see 'journal.journal_for_save()')
+    if engine.journal is not None:
+        meta["journal"] = {"seed": engine.journal.header.seed, "turns": engine.journal.turns}
+
+    with open(os.path.join(staging, "meta.json"), "w") as file:
+        json.dump(meta, file)
+
+    # Swap the new save in. The old files are only unlinked, so a game memory mapped from them keeps working.
+    previous = directory.rstrip("/\\") + ".old"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.isdir(directory):
+        os.rename(directory, previous)
+    os.rename(staging, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+
+#_______________________________________________________________________// FUNCTIONS - LOAD
+
+def restore_entity(record: np.void, paths: np.ndarray) -> Entity:
+    '''
+    Rebuilds one entity (and its Fighter and AI components) from its saved record.
+    '''
+    char = chr(int(record["ch"]))
+    color = tuple(record["fg"].tolist())
+    name = str(record["name"])
+
+    if not record["is_actor"]:
+        entity = Entity(x=int(record["x"]), y=int(record["y"]), char=char, color=color, name=name)
+
+    else:
+        ai_name = str(record["ai"])
+        entity = Actor(
+            x       = int(record["x"]),
+            y       = int(record["y"]),
+            char    = char,
+            color   = color,
+            name    = name,
+            ai_cls  = AI_CLASSES.get(ai_name, HostileEnemy),
+            fighter = Fighter(hp=int(record["max_hp"]), defense=int(record["defense"]), power=int(record["power"])),
+            speed   = int(record["speed"]),
+        )
+        # Set current hp directly (the setter would run 'die()' for a saved corpse)
+        entity.fighter._hp = int(record["hp"])
+
+        if not ai_name:
+            entity.ai = None
+        elif record["path_length"]:
+            start = int(record["path_start"])
+            entity.ai.path = paths[start: start + int(record["path_length"])].copy()     # type: ignore
+            entity.ai.path_step = int(record["path_step"])                              # type: ignore
+
+    entity.blocks_movement = bool(record["blocks"])
+    entity.render_order = RenderOrder(int(record["render_order"]))
+
+    return entity
+
+
+
+def load_map(engine: Engine, directory: str) -> GameMap:
+    '''
+    Reads a GameMap written by 'save_map()' (layers memory mapped) and registers its entities on it.
+    - If the save holds the player, the engine's player is swapped for the saved one.
+    - The awake actors are woken again, and their turns rescheduled in the saved order (the map's clock restarts at 0).
+    '''
+    tiles = np.load(os.path.join(directory, "tiles.npy"), mmap_mode="c")
+    width, height = tiles.shape
+
+    game_map = GameMap(engine, width, height, tiles=tiles)
+    game_map.visible = np.load(os.path.join(directory, "visible.npy"), mmap_mode="c")
+    game_map.explored = np.load(os.path.join(directory, "explored.npy"), mmap_mode="c")
+
+    records = np.load(os.path.join(directory, "entities.npy"))
+    paths = np.load(os.path.join(directory, "paths.npy"))
+
+    rows = np.empty(len(records), dtype=np.intp)
+    for i, record in enumerate(records):
+        entity = restore_entity(record, paths)
+        if record["is_player"]:
+            engine.player = entity      # type: ignore
+        entity.place(entity.x, entity.y, game_map)
+        rows[i] = entity.store_index
+
+    # Every actor was added dormant: wake the ones that were awake, then hand out their turns in the saved order
+    # (records without a scheduled turn sort last, and only join the awake set)
+    awake = np.flatnonzero(records["awake"])
+    awake = awake[np.lexsort((records["turn_order"][awake], records["next_turn"][awake] < 0))]
+    game_map.dormant.wake(rows[awake].tolist())
+    for i in awake.tolist():
+        if records[i]["next_turn"] < 0:
+            game_map.scheduler.cancel(int(rows[i]))
+        else:
+            game_map.scheduler.schedule(int(rows[i]), int(records[i]["next_turn"]))
+
+    return game_map
+
+
+
+def read_meta(directory: str) -> Dict[str, Any]:
+    '''
+    Returns a save's header ('meta.json').
+    '''
+    with open(os.path.join(directory, "meta.json")) as file:
+        return json.load(file)
+
+
+
+def load_game(directory: str) -> Engine:
+    '''
+    Loads a save written by 'save_game()' and returns a ready-to-play Engine.
+    - If other levels were saved with it, the engine gets a level manager ('engine.levels') holding them.
+    '''
+    # (Imported here: 'level_manager' imports this module to evict levels)
+    from level_manager import LevelManager
+
+    meta = read_meta(directory)
+    if meta["version"] != SAVE_VERSION:
+        raise ValueError(f"Unsupported save version {meta['version']} (expected {SAVE_VERSION}).")
+
+    # The real player is swapped in by 'load_map()' once its record is read
+    engine = Engine(player=None)    # type: ignore
+    engine.game_map = load_map(engine, directory)
+    engine.depth = meta["depth"]
+
+    levels_directory = os.path.join(directory, "levels")
+    if os.path.isdir(levels_directory):
+        engine.levels = LevelManager(engine)
+        engine.levels.load(levels_directory)
+
+    if not engine.player.is_alive:
+        engine.event_handler = GameOverEventHandler(engine)
+
+    return engine
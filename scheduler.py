@@ -0,0 +1,109 @@
+'''
+Turn scheduling: a priority queue of the awake actors' next turns, keyed by game time.
+
+Time is counted in "time units". An action's 'cost' (see 'actions.Action') is how long it takes at 'NORMAL_SPEED';
+an actor's 'speed' scales that ('duration()'): at speed 200 a 100 cost action takes 50 units, at speed 50 it takes 200.
+
+Each GameMap has a 'TurnScheduler' ('game_map.scheduler') with its own clock, so a level only ages while it's played:
+    - 'time' is the current time on that map (when the player last acted).
+    - The engine pushes the clock forward by the duration of each player action, and every actor whose turn comes up
+      before then is popped ('pop_due()') and acts, then is pushed back at its current time plus the duration of what it did.
+    - Only awake actors are scheduled ('DormantIndex.wake()' / 'sleep()' add and cancel their entries),
+      so no turn ever sweeps over the whole population, and fast/slow actors simply come up more/less often.
+    - Entries are (time, sequence number, row): ties are broken by the order actors were scheduled in, so turn order is deterministic.
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import heapq
+import itertools
+from typing import (Dict, List, Tuple)
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+# Cost of an ordinary action (a step, an attack, waiting), and the speed at which it takes exactly that long
+TURN_COST = 100
+NORMAL_SPEED = 100
+
+
+
+#_______________________________________________________________________// CLASS
+
+class TurnScheduler:
+
+    def __init__(self):
+        self.time = 0
+        # Heap of (time, sequence number, row)
+        self.queue: List[Tuple[int, int, int]] = []
+        # Sequence number of each scheduled row's live entry (an entry whose number doesn't match was cancelled or replaced)
+        self.tickets: Dict[int, int] = {}
+        self._sequence = itertools.count()
+
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+
+    def __contains__(self, row: int) -> bool:
+        return row in self.tickets
+
+
+    def schedule(self, row: int, time: int) -> None:
+        '''
+        Gives a row its next turn at 'time' (replacing any turn it already had).
+        '''
+        ticket = next(self._sequence)
+        self.tickets[row] = ticket
+        heapq.heappush(self.queue, (time, ticket, row))
+
+
+    def cancel(self, row: int) -> None:
+        '''
+        Drops a row's next turn (its heap entry is skipped once it reaches the top).
+        '''
+        self.tickets.pop(row, None)
+
+
+    def pop_due(self, until: int) -> Tuple[int, List[int]]:
+        '''
+        Pops every row whose turn is at the earliest scheduled time, if that time is before 'until'.
+        Returns that time and the rows (in the order they were scheduled), or ('until', []) if no turn comes up before then.
+        '''
+        queue, tickets = self.queue, self.tickets
+
+        while queue and tickets.get(queue[0][2]) != queue[0][1]:
+            heapq.heappop(queue)
+        if not queue or queue[0][0] >= until:
+            return until, []
+
+        time = queue[0][0]
+        rows = []
+        while queue and queue[0][0] == time:
+            _, ticket, row = heapq.heappop(queue)
+            if tickets.get(row) == ticket:
+                del tickets[row]
+                rows.append(row)
+
+        return time, rows
+
+
+    def upcoming(self) -> List[Tuple[int, int]]:
+        '''
+        Returns (time, row) for every scheduled turn, in the order they'll come up (ties in the order they were scheduled).
+        Scheduling them again in this order into a new scheduler reproduces the same turn order (see 'savegame.save_map()').
+        '''
+        return [(time, row) for time, ticket, row in sorted(self.queue) if self.tickets.get(row) == ticket]
+
+
+
+#_______________________________________________________________________// FUNCTION
+
+def duration(cost: int, speed: int) -> int:
+    '''
+    Returns how many time units an action of 'cost' takes an actor moving at 'speed' (at least 1).
+    '''
+    return max(1, cost * NORMAL_SPEED // max(1, speed))
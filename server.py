@@ -0,0 +1,397 @@
+'''
+Game server: hosts many independent game sessions (each a 'HeadlessGame' with its own Engine) for bots and spectators.
+
+Clients connect over a local socket (a Unix domain socket path, or "host:port" for TCP on platforms without one)
+and exchange newline-delimited JSON. Every request gets exactly one reply, in order:
+
+    {"op": "new", "seed": 1}                                -> {"session": 7, "turn": 0, "x": ..., "y": ..., "hp": ..., "alive": true, ...}
+    {"op": "act", "session": 7, "action": "bump", "dx": 1, "dy": 0}
+    {"op": "act", "session": 7, "action": "wait"}           -> the session's new state (as above)
+    {"op": "state", "session": 7}                           -> the session's state
+    {"op": "view", "session": 7}                            -> the state, plus "view": the rendered map as a list of text rows
+    {"op": "close", "session": 7}                           -> {"session": 7, "closed": true}
+    (anything invalid)                                      -> {"error": "..."}
+
+Sessions run in the server's asyncio event loop ('--shards 0'), or are spread over worker processes ('--shards N'):
+each session lives in one worker for its whole life (session id modulo N), so N workers use up to N cores.
+
+Usage:
+    >> python server.py --address rogue.sock --shards 4                   (serve until interrupted)
+    >> python server.py --bench --sessions 200 --turns 100 --shards 4     (bot load test, prints sessions per core)
+'''
+
+
+#_______________________________________________________________________// MODULES
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import multiprocessing
+from multiprocessing.connection import Connection
+import os
+import random
+import socket
+import time
+from typing import (Any, Dict, List)
+
+import tcod
+
+from actions import (Action, BumpAction, WaitAction)
+from headless import HeadlessGame
+
+
+
+#_______________________________________________________________________// DECLARATIONS
+
+DEFAULT_ADDRESS = "rogue.sock" if hasattr(socket, "AF_UNIX") else "127.0.0.1:8765"
+
+# A request or reply (one line of JSON)
+Message = Dict[str, Any]
+
+
+
+#_______________________________________________________________________// CLASSES
+
+class SessionHost:
+    '''
+    Holds game sessions by id and runs requests against them.
+    The server has one (no shards), or each shard worker process has its own.
+    '''
+
+    def __init__(self):
+        self.sessions: Dict[int, HeadlessGame] = {}
+
+
+    def state(self, session: int) -> Message:
+        '''
+        Returns a session's current state (what a bot needs to pick its next action).
+        '''
+        game = self.sessions[session]
+        player = game.player
+        return {
+            "session":  session,
+            "turn":     game.turn,
+            "x":        player.x,
+            "y":        player.y,
+            "hp":       player.fighter.hp,
+            "max_hp":   player.fighter.max_hp,
+            "alive":    not game.game_over,
+            "depth":    game.engine.depth,
+        }
+
+
+    def view(self, session: int) -> List[str]:
+        '''
+        Renders a session's map (what the player would see on screen) as text rows, for spectators.
+        '''
+        game_map = self.sessions[session].engine.game_map
+        view = game_map.viewport()
+        console = tcod.console.Console(view[0].stop - view[0].start, view[1].stop - view[1].start, order="F")
+        game_map.render(console)
+
+        return ["".join(map(chr, row)) for row in console.ch.T.tolist()]
+
+
+    def handle(self, request: Message) -> Message:
+        '''
+        Runs one request and returns its reply (errors are replied, never raised).
+        '''
+        op = request.get("op")
+        session = request.get("session")
+
+        try:
+            if op == "new":
+                self.sessions[session] = HeadlessGame(
+                    seed        = request.get("seed"),
+                    max_enemies = int(request.get("max_enemies", 2)),
+                    overworld   = bool(request.get("overworld", False)),
+                )
+                return self.state(session)
+
+            if session not in self.sessions:
+                return {"error": f"unknown session: {session!r}"}
+
+            if op == "act":
+                self.sessions[session].step(self.action(session, request))
+                return self.state(session)
+
+            if op == "state":
+                return self.state(session)
+
+            if op == "view":
+                return {**self.state(session), "view": self.view(session)}
+
+            if op == "close":
+                self.sessions.pop(session).close()
+                return {"session": session, "closed": True}
+
+            return {"error": f"unknown op: {op!r}"}
+
+        except (KeyError, TypeError, ValueError) as error:
+            return {"error": f"bad {op!r} request: {error!r}"}
+
+
+    def close(self) -> None:
+        '''
+        Closes every session still open (ex: an overworld session's chunk directory is deleted).
+        '''
+        for game in self.sessions.values():
+            game.close()
+        self.sessions.clear()
+
+
+    def action(self, session: int, request: Message) -> Action:
+        # Turns an 'act' request into the player's action
+        player = self.sessions[session].player
+        name = request.get("action")
+
+        if name == "bump":
+            dx, dy = int(request["dx"]), int(request["dy"])
+            if max(abs(dx), abs(dy)) > 1:
+                raise ValueError("dx/dy must be -1, 0 or 1")
+            return BumpAction(player, dx, dy)
+
+        if name == "wait":
+            return WaitAction(player)
+
+        raise ValueError(f"unknown action: {name!r}")
+
+
+
+class Shard:
+    '''
+    A worker process with its own 'SessionHost'. Requests are sent over a pipe one at a time;
+    the blocking round trip runs in a thread, so the event loop keeps serving other shards and clients meanwhile.
+    '''
+
+    def __init__(self):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_shard, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        self.lock = asyncio.Lock()
+
+
+    def _round_trip(self, request: Message) -> Message:
+        self.connection.send(request)
+        return self.connection.recv()
+
+
+    async def handle(self, request: Message) -> Message:
+        async with self.lock:
+            return await asyncio.get_running_loop().run_in_executor(None, self._round_trip, request)
+
+
+    def close(self) -> None:
+        self.connection.send(None)
+        self.process.join(timeout=5)
+
+
+
+class GameServer:
+    '''
+    Accepts clients on a local socket and routes their requests to sessions: in this process, or in 'shards' worker processes.
+    '''
+
+    def __init__(self, shards: int = 0):
+        self.host = SessionHost()
+        self.shards: List[Shard] = []
+        self.shard_count = shards
+        # Ids handed out to new sessions
+        self.next_session = 1
+
+
+    async def handle_request(self, request: Message) -> Message:
+        if request.get("op") == "new":
+            request["session"] = self.next_session
+            self.next_session += 1
+
+        session = request.get("session")
+        if not self.shards:
+            return self.host.handle(request)
+        if not isinstance(session, int):
+            return {"error": f"unknown session: {session!r}"}
+
+        return await self.shards[session % len(self.shards)].handle(request)
+
+
+    async def serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''
+        Replies to one client's requests (one JSON object per line) until it disconnects.
+        '''
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request must be a JSON object")
+                except ValueError as error:
+                    reply = {"error": f"bad request: {error}"}
+                else:
+                    reply = await self.handle_request(request)
+
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+    async def start(self, address: str = DEFAULT_ADDRESS) -> asyncio.AbstractServer:
+        '''
+        Starts the shard workers (if any) and starts listening on 'address' (a socket path, or "host:port").
+        '''
+        self.shards = [Shard() for _ in range(self.shard_count)]
+
+        if ":" in address:
+            host, port = address.rsplit(":", 1)
+            return await asyncio.start_server(self.serve_client, host, int(port))
+
+        # A socket file left behind by a server that didn't shut down cleanly
+        if os.path.exists(address):
+            os.unlink(address)
+        return await asyncio.start_unix_server(self.serve_client, path=address)
+
+
+    def close(self) -> None:
+        # (Each shard closes its own sessions before its worker exits)
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+        self.host.close()
+
+
+
+class LocalClient:
+    '''
+    Stand-in client (ex: a bot, or a spectator) talking to a 'GameServer' over its local socket.
+    '''
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+
+    @classmethod
+    async def connect(cls, address: str = DEFAULT_ADDRESS) -> LocalClient:
+        if ":" in address:
+            host, port = address.rsplit(":", 1)
+            return cls(*await asyncio.open_connection(host, int(port)))
+
+        return cls(*await asyncio.open_unix_connection(address))
+
+
+    async def request(self, op: str, **fields: Any) -> Message:
+        '''
+        Sends one request and waits for its reply.
+        '''
+        self.writer.write(json.dumps({"op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+
+        return json.loads(await self.reader.readline())
+
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+
+#_______________________________________________________________________// FUNCTIONS
+
+def _run_shard(connection: Connection) -> None:
+    '''
+    Worker process: answers requests from the server until it sends 'None'.
+    '''
+    host = SessionHost()
+    try:
+        while (request := connection.recv()) is not None:
+            connection.send(host.handle(request))
+    finally:
+        host.close()
+
+
+
+async def _random_bot(address: str, seed: int, turns: int) -> int:
+    '''
+    Connects, plays 'turns' random bump/wait actions (starting a new session whenever the player dies), and returns the turns played.
+    '''
+    client = await LocalClient.connect(address)
+    rng = random.Random(seed)
+
+    state = await client.request("new", seed=seed)
+    for _ in range(turns):
+        dx, dy = rng.randint(-1, 1), rng.randint(-1, 1)
+        state = await client.request("act", session=state["session"], action="bump" if dx or dy else "wait", dx=dx, dy=dy)
+        if not state["alive"]:
+            await client.request("close", session=state["session"])
+            state = await client.request("new", seed=rng.getrandbits(32))
+
+    await client.request("close", session=state["session"])
+    await client.close()
+
+    return turns
+
+
+
+async def benchmark(sessions: int, turns: int, shards: int, address: str, rate: float) -> None:
+    '''
+    Runs 'sessions' random bots at once against a server, and prints the turn throughput and how many sessions
+    one core can host at 'rate' turns per second per session.
+    (The bots run in the server's process, so their own JSON/socket work is counted against it too.)
+    '''
+    server = GameServer(shards)
+    listener = await server.start(address)
+
+    start = time.perf_counter()
+    played = await asyncio.gather(*(_random_bot(address, seed, turns) for seed in range(sessions)))
+    elapsed = time.perf_counter() - start
+
+    listener.close()
+    await listener.wait_closed()
+    server.close()
+
+    cores = max(1, shards)
+    turns_per_second = sum(played) / elapsed
+    print(f"{sessions} sessions x {turns} turns, {shards} shards: {sum(played)} turns in {elapsed:.2f}s ({turns_per_second:.0f} turns/s)")
+    print(f"{turns_per_second / cores:.0f} turns/s per core -> {turns_per_second / cores / rate:.0f} sessions per core at {rate:g} turns/s each")
+
+
+
+async def serve(address: str, shards: int) -> None:
+    server = GameServer(shards)
+    listener = await server.start(address)
+    print(f"Serving game sessions on {address} ({shards or 'no'} shards)")
+
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Host many game sessions for local socket clients (bots, spectators).")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="unix socket path, or host:port for TCP")
+    parser.add_argument("--shards", type=int, default=0, help="worker processes to spread sessions over (0: run them in the server)")
+    parser.add_argument("--bench", action="store_true", help="run random bots against a server and report sessions per core")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=5.0, help="turns per second a session needs (for sessions per core)")
+    args = parser.parse_args()
+
+    if args.bench:
+        asyncio.run(benchmark(args.sessions, args.turns, args.shards, args.address, args.rate))
+    else:
+        try:
+            asyncio.run(serve(args.address, args.shards))
+        except KeyboardInterrupt:
+            pass
+
+
+
+if __name__ == '__main__':
+    main()